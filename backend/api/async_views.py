@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework.permissions import SAFE_METHODS
+
+
+# Эндпоинты чтения, которые под ASGI обслуживаются асинхронно.
+ASYNC_READ_ROUTES = ('recipes-list', 'recipes-detail', 'ingredients-list')
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_READ_THREADS, thread_name_prefix='async-read'
+)
+
+
+def render_view(view, request, *args, **kwargs):
+    """
+    Синхронное представление с отрисовкой ответа: сериализация
+    и ленивые запросы выполняются в том же потоке.
+    """
+    response = view(request, *args, **kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+def run_in_thread(view, request, *args, **kwargs):
+    """
+    Представление в потоке пула: соединения потока проверяются,
+    как в начале и конце обычного запроса. Контекст запроса, а с ним
+    реплика и учет SQL в метриках, переходит в поток вместе с вызовом.
+    """
+    close_old_connections()
+    try:
+        return render_view(view, request, *args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    """
+    Асинхронная обертка синхронного DRF-представления. В Django 3.2
+    нет асинхронного ORM, а синхронные представления под ASGI
+    выполняются по очереди в одном потоке. Безопасные запросы здесь
+    выполняются параллельно в пуле из ASYNC_READ_THREADS потоков
+    и не занимают цикл событий, пока ждут БД. Запросы с записью
+    идут как обычно, в общем потоке. Ответ тот же, что у view.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if settings.ASYNC_READ_VIEWS and request.method in SAFE_METHODS:
+            run = sync_to_async(
+                run_in_thread, thread_sensitive=False, executor=executor
+            )
+        else:
+            run = sync_to_async(render_view)
+        return await run(view, request, *args, **kwargs)
+    return wrapper
+
+
+def async_read_urls(urls):
+    """
+    Маршруты роутера, в которых ASYNC_READ_ROUTES обслуживаются
+    асинхронными представлениями.
+    """
+    for pattern in urls:
+        if getattr(pattern, 'name', None) in ASYNC_READ_ROUTES:
+            pattern.callback = async_read_view(pattern.callback)
+    return urls
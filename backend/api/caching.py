@@ -0,0 +1,182 @@
+import math
+from functools import wraps
+from hashlib import md5
+from time import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response, \
+    patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from rest_framework.response import Response
+
+from foodgram.db.router import read_primary_after
+from recipes.models import Recipe
+from recipes.versions import get_versions
+
+
+CACHE_STATS_KEY = 'recipes-cache:{}'
+
+
+def catalogue_versions(*names):
+    """
+    Версии справочников, от которых зависит ответ.
+    """
+    def versions(request, *args, **kwargs):
+        return get_versions(*names)
+    return versions
+
+
+def recipe_exists(name):
+    """
+    Версия рецепта хранится, только если рецепт есть в БД.
+    Проверка выполняется лишь при отсутствии версии в кэше.
+    """
+    if not name.startswith('recipe:'):
+        return True
+    pk = name[len('recipe:'):]
+    return pk.isdigit() and Recipe.objects.filter(pk=pk).exists()
+
+
+def recipe_versions(request, pk, *args, **kwargs):
+    """
+    Версии данных рецепта: сам рецепт, справочники, профили авторов
+    и избранное/корзина/подписки текущего пользователя.
+    """
+    viewer = 'anonymous'
+    if request.user.is_authenticated:
+        viewer = f'user:{request.user.pk}'
+    return get_versions(
+        f'recipe:{pk}', 'tags', 'ingredients', 'users', viewer,
+        exists=recipe_exists,
+    )
+
+
+def anonymous_recipe_versions(request, pk=None, *args, **kwargs):
+    """
+    Версии данных анонимной страницы рецептов: списка или одного рецепта.
+    """
+    recipes = 'recipes' if pk is None else f'recipe:{pk}'
+    return get_versions(
+        recipes, 'tags', 'ingredients', 'users', exists=recipe_exists
+    )
+
+
+def make_etag(request, versions):
+    """
+    ETag по версиям данных и запрошенному представлению.
+    """
+    source = '|'.join([
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+        *(f'{name}={version}' for name, version in sorted(versions.items()))
+    ])
+    return quote_etag(md5(source.encode()).hexdigest())
+
+
+def conditional(get_versions_func, private=False):
+    """
+    Условный GET по версиям данных: ETag, Last-Modified и 304 без
+    сериализации ответа. Публичные справочники кэшируются на
+    HTTP_CACHE_MAX_AGE секунд, персональные ответы всегда проверяются.
+
+    Last-Modified округляется вверх до секунды и не отдается, пока
+    эта секунда не прошла: иначе изменение в ту же секунду дало бы
+    тот же Last-Modified и устаревший ответ 304 на If-Modified-Since.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            versions = get_versions_func(request, *args, **kwargs)
+            etag = make_etag(request, versions)
+            last_modified = math.ceil(max(versions.values()))
+            if last_modified > time():
+                last_modified = None
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                # Ответ закрепляется за ETag новой версии, поэтому
+                # сразу после изменения он строится по основной БД.
+                with read_primary_after(max(versions.values())):
+                    response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    response.headers.setdefault('ETag', etag)
+                    if last_modified is not None:
+                        response.headers.setdefault(
+                            'Last-Modified', http_date(last_modified)
+                        )
+            else:
+                response.headers['ETag'] = etag
+            if private:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(
+                    response, public=True,
+                    max_age=settings.HTTP_CACHE_MAX_AGE
+                )
+            patch_vary_headers(response, ('Accept', 'Authorization'))
+            return response
+        return wrapper
+    return decorator
+
+
+def recipes_cache():
+    return caches[settings.RECIPES_CACHE_ALIAS]
+
+
+def count_cache_access(result):
+    cache = recipes_cache()
+    key = CACHE_STATS_KEY.format(result)
+    cache.add(key, 0, timeout=None)
+    cache.incr(key)
+
+
+def recipes_cache_stats():
+    """
+    Счетчики попаданий и промахов кэша анонимных страниц рецептов.
+    """
+    keys = {CACHE_STATS_KEY.format(name): name for name in ('hits', 'misses')}
+    stats = recipes_cache().get_many(keys)
+    return {name: stats.get(key, 0) for key, name in keys.items()}
+
+
+def cached_for_anonymous(get_versions_func):
+    """
+    Кэш сериализованных ответов для анонимных пользователей.
+    Ключ строится по адресу с параметрами запроса (page, limit, tags,
+    author) и версиям данных, поэтому записи устаревают ровно при
+    изменении рецептов, их тегов, ингредиентов или авторов.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            versions = get_versions_func(request, *args, **kwargs)
+            key = 'recipes-page:' + md5('|'.join([
+                request.build_absolute_uri(request.path),
+                '&'.join(sorted(request.GET.urlencode().split('&'))),
+                request.META.get('HTTP_ACCEPT', ''),
+                *(f'{name}={version}'
+                  for name, version in sorted(versions.items()))
+            ]).encode()).hexdigest()
+            cache = recipes_cache()
+            data = cache.get(key)
+            if data is not None:
+                count_cache_access('hits')
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return response
+            count_cache_access('misses')
+            with read_primary_after(max(versions.values())):
+                response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(
+                    key, response.data, timeout=settings.RECIPES_CACHE_TIMEOUT
+                )
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Кэши, которые не видны другим процессам: в них ключи чтения
+# с основной БД после записи теряются между воркерами.
+LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register()
+def replica_cache_check(app_configs, **kwargs):
+    """
+    Реплики чтения включаются только с общим для всех процессов кэшем.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.DATABASE_REPLICAS and backend in LOCAL_CACHES:
+        return [Error(
+            f'Реплики DATABASE_REPLICAS включены с локальным кэшем '
+            f'{backend}.',
+            hint=(
+                'После записи клиент должен читать с основной БД, но '
+                'отметка об этом хранится в кэше default и другие '
+                'воркеры ее не видят. Задайте CACHE_URL с Redis или '
+                'Memcached либо уберите DATABASE_REPLICA_URLS.'
+            ),
+            id='api.E001',
+        )]
+    return []
@@ -1,3 +1,5 @@
+from django.db.models import Case, When, Value, IntegerField, Exists, \
+    OuterRef
 from django_filters import rest_framework as filters
 
 from recipes.models import Recipe, Tag, Ingredient
@@ -8,6 +10,7 @@ class RecipeFilter(filters.FilterSet):
         field_name='tags__slug',
         queryset=Tag.objects.all(),
         to_field_name='slug',
+        method='filter_tags',
     )
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
@@ -18,6 +21,21 @@ class RecipeFilter(filters.FilterSet):
         model = Recipe
         fields = ['author', 'tags']
 
+    def filter_tags(self, queryset, name, value):
+        """
+        Рецепты хотя бы с одним из тегов. Подзапрос EXISTS не размножает
+        строки рецептов, поэтому DISTINCT не нужен.
+        """
+        if not value:
+            return queryset
+        return queryset.filter(
+            Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe=OuterRef('pk'), tag__in=value
+                )
+            )
+        )
+
     def filter_is_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated:
             return queryset.filter(in_favorite__user=self.request.user)
@@ -30,8 +48,22 @@ class RecipeFilter(filters.FilterSet):
 
 
 class IngredientFilter(filters.FilterSet):
-    name = filters.CharFilter(lookup_expr='istartswith')
+    name = filters.CharFilter(method='filter_name')
 
     class Meta:
         model = Ingredient
         fields = ['name', ]
+
+    def filter_name(self, queryset, name, value):
+        """
+        Поиск по вхождению в название: сначала совпадения с начала
+        названия, затем остальные. На PostgreSQL запросы обслуживают
+        индексы по UPPER(name) - text_pattern_ops и триграммный GIN.
+        """
+        return queryset.filter(name__icontains=value).annotate(
+            match_rank=Case(
+                When(name__istartswith=value, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        ).order_by('match_rank', 'name')
@@ -0,0 +1,225 @@
+import json
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag, User
+
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(values, percent):
+    """
+    Перцентиль методом ближайшего ранга.
+    """
+    ordered = sorted(values)
+    rank = max(0, -(-len(ordered) * percent // 100) - 1)
+    return ordered[rank]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон эндпоинтов API через тестовый клиент: '
+        'перцентили задержки и число SQL-запросов на эндпоинт. '
+        'Результаты сохраняются в JSON для сравнения между коммитами. '
+        'Данные для прогона создает seed_benchmark_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Очищать кэши перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--endpoints',
+            nargs='*',
+            help='Запускать только эндпоинты с этими именами.',
+        )
+        parser.add_argument('--output', help='Файл для результатов JSON.')
+        parser.add_argument(
+            '--compare', help='JSON предыдущего прогона для сравнения.'
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(
+            favorites__isnull=False, my_cart__isnull=False,
+            writers__isnull=False,
+        ).first()
+        recipe = Recipe.objects.first()
+        if user is None or recipe is None:
+            raise CommandError(
+                'БД пуста, заполните ее командой seed_benchmark_data.'
+            )
+        endpoints = dict(self.endpoints(user, recipe))
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - endpoints.keys()
+            if unknown:
+                raise CommandError(
+                    'Неизвестные эндпоинты: ' + ', '.join(sorted(unknown))
+                )
+            endpoints = {
+                name: endpoint for name, endpoint in endpoints.items()
+                if name in options['endpoints']
+            }
+
+        results = {}
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        ):
+            for name, (client, url) in endpoints.items():
+                results[name] = self.measure(client, url, options)
+                self.stdout.write(self.format_result(name, results[name]))
+
+        report = {
+            'commit': self.git_commit(),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'cold': options['cold'],
+            'rows': {
+                'users': User.objects.count(),
+                'recipes': Recipe.objects.count(),
+                'ingredients': Ingredient.objects.count(),
+            },
+            'endpoints': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def endpoints(self, user, recipe):
+        """
+        Эндпоинты из api.urls: имя, клиент и адрес запроса.
+        """
+        anonymous = APIClient()
+        client = APIClient()
+        client.force_authenticate(user)
+        tags = '&'.join(
+            f'tags={slug}'
+            for slug in Tag.objects.values_list('slug', flat=True)[:2]
+        )
+        yield 'recipes_anonymous', (anonymous, '/api/recipes/')
+        yield 'recipes', (client, '/api/recipes/')
+        yield 'recipes_page_10', (client, '/api/recipes/?page=10')
+        yield 'recipes_cursor', (
+            client, '/api/recipes/?pagination=cursor'
+        )
+        yield 'recipes_by_tags', (client, f'/api/recipes/?{tags}')
+        yield 'recipes_by_author', (
+            client, f'/api/recipes/?author={recipe.author_id}'
+        )
+        yield 'recipes_favorited', (
+            client, '/api/recipes/?is_favorited=1'
+        )
+        yield 'recipes_in_cart', (
+            client, '/api/recipes/?is_in_shopping_cart=1'
+        )
+        yield 'recipe_detail_anonymous', (
+            anonymous, f'/api/recipes/{recipe.pk}/'
+        )
+        yield 'recipe_detail', (client, f'/api/recipes/{recipe.pk}/')
+        yield 'download_shopping_cart', (
+            client, '/api/recipes/download_shopping_cart/'
+        )
+        yield 'ingredients_search', (client, '/api/ingredients/?name=со')
+        yield 'tags', (client, '/api/tags/')
+        yield 'users', (client, '/api/users/')
+        yield 'user_detail', (client, f'/api/users/{recipe.author_id}/')
+        yield 'subscriptions', (
+            client, '/api/users/subscriptions/?recipes_limit=3'
+        )
+
+    def measure(self, client, url, options):
+        for _ in range(options['warmup']):
+            self.request(client, url)
+        timings, queries, statuses = [], [], set()
+        for _ in range(options['iterations']):
+            if options['cold']:
+                for cache in caches.all():
+                    cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = self.request(client, url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+            statuses.add(response.status_code)
+        return {
+            'url': url,
+            'status': sorted(statuses),
+            'queries': {'min': min(queries), 'max': max(queries)},
+            'latency_ms': {
+                'mean': round(statistics.mean(timings), 3),
+                'min': round(min(timings), 3),
+                'max': round(max(timings), 3),
+                **{
+                    f'p{percent}': round(percentile(timings, percent), 3)
+                    for percent in PERCENTILES
+                },
+            },
+        }
+
+    def request(self, client, url):
+        response = client.get(url)
+        if getattr(response, 'streaming', False):
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def format_result(self, name, result):
+        latency = result['latency_ms']
+        return (
+            f'{name:<26} '
+            + ' '.join(
+                f'p{percent}={latency[f"p{percent}"]:8.2f}ms'
+                for percent in PERCENTILES
+            )
+            + f' queries={result["queries"]["max"]:<3}'
+            f' status={",".join(map(str, result["status"]))}'
+        )
+
+    def compare(self, path, results):
+        """
+        Изменение p95 и числа запросов относительно прошлого прогона.
+        """
+        with open(path, encoding='utf-8') as file:
+            previous = json.load(file)
+        self.stdout.write(
+            f'Сравнение с {previous.get("commit") or path}:'
+        )
+        for name, result in results.items():
+            before = previous['endpoints'].get(name)
+            if before is None:
+                continue
+            p95, p95_before = (
+                result['latency_ms']['p95'], before['latency_ms']['p95']
+            )
+            change = (p95 - p95_before) / p95_before * 100 if p95_before else 0
+            self.stdout.write(
+                f'{name:<26} p95 {p95_before:8.2f} -> {p95:8.2f}ms '
+                f'({change:+.0f}%), queries '
+                f'{before["queries"]["max"]} -> {result["queries"]["max"]}'
+            )
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True,
+                cwd=settings.BASE_DIR,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
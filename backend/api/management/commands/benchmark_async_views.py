@@ -0,0 +1,145 @@
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient
+from django.test.utils import override_settings
+from django.urls import resolve
+from rest_framework.authtoken.models import Token
+
+from api.async_views import ASYNC_READ_ROUTES
+from recipes.models import Recipe, User
+
+from .benchmark_api import PERCENTILES, percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение синхронных и асинхронных эндпоинтов чтения под ASGI '
+        'при медленной БД: каждый SQL-запрос задерживается на --delay мс, '
+        'клиенты шлют запросы параллельно. Заодно проверяется, что оба '
+        'режима возвращают одинаковый JSON. Требует ASYNC_READ_VIEWS=True.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument(
+            '--requests', type=int, default=64,
+            help='Число запросов к эндпоинту в каждом режиме.',
+        )
+        parser.add_argument(
+            '--delay', type=float, default=20,
+            help='Задержка каждого SQL-запроса, мс.',
+        )
+
+    def handle(self, *args, **options):
+        recipe = Recipe.objects.first()
+        user = User.objects.first()
+        if recipe is None or user is None:
+            raise CommandError(
+                'БД пуста, заполните ее командой seed_benchmark_data.'
+            )
+        token, _ = Token.objects.get_or_create(user=user)
+        headers = {'authorization': f'Token {token.key}'}
+        endpoints = {
+            'recipes': '/api/recipes/',
+            'recipe_detail': f'/api/recipes/{recipe.pk}/',
+            'ingredients_search': '/api/ingredients/?name=со',
+        }
+        # Маршруты импортируются при первом resolve, и до переключения
+        # режимов важно, чтобы это произошло с настройками процесса.
+        if not all(
+            asyncio.iscoroutinefunction(resolve(urlsplit(url).path).func)
+            for url in endpoints.values()
+        ):
+            raise CommandError(
+                'Асинхронные маршруты подключаются при ASYNC_READ_VIEWS=True.'
+            )
+        self.stdout.write(
+            f'Маршруты: {", ".join(ASYNC_READ_ROUTES)}; '
+            f'потоков чтения: {settings.ASYNC_READ_THREADS}, '
+            f'клиентов: {options["concurrency"]}, '
+            f'задержка SQL: {options["delay"]:.0f} мс'
+        )
+
+        def slow_down(sender, connection, **kwargs):
+            connection.execute_wrappers.append(
+                self.delayed(options['delay'] / 1000)
+            )
+
+        connections.close_all()
+        connection_created.connect(slow_down)
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+            ):
+                for name, url in endpoints.items():
+                    self.compare(name, url, headers, options)
+        finally:
+            connection_created.disconnect(slow_down)
+            connections.close_all()
+
+    def delayed(self, delay):
+        def wrapper(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+        return wrapper
+
+    def compare(self, name, url, headers, options):
+        results = {}
+        for mode, enabled in (('sync', False), ('async', True)):
+            with override_settings(ASYNC_READ_VIEWS=enabled):
+                results[mode] = asyncio.run(
+                    self.measure(url, headers, options)
+                )
+            self.stdout.write(self.format_result(name, mode, results[mode]))
+        sync, async_ = results['sync'], results['async']
+        if sync['body'] != async_['body']:
+            raise CommandError(f'{name}: ответы режимов различаются.')
+        self.stdout.write(self.style.SUCCESS(
+            f'{name}: ускорение x{async_["rps"] / sync["rps"]:.2f}, '
+            f'ответы совпадают'
+        ))
+
+    async def measure(self, url, headers, options):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        timings, statuses = [], set()
+
+        async def request():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(url, **headers)
+                timings.append((time.perf_counter() - started) * 1000)
+                statuses.add(response.status_code)
+                return response
+
+        response = await request()
+        timings.clear()
+        started = time.perf_counter()
+        await asyncio.gather(*(request() for _ in range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        return {
+            'rps': options['requests'] / elapsed,
+            'status': sorted(statuses),
+            'body': json.loads(response.content),
+            **{
+                f'p{percent}': percentile(timings, percent)
+                for percent in PERCENTILES
+            },
+        }
+
+    def format_result(self, name, mode, result):
+        return (
+            f'{name:<20} {mode:<6} {result["rps"]:7.1f} запросов/с '
+            + ' '.join(
+                f'p{percent}={result[f"p{percent}"]:8.1f}ms'
+                for percent in PERCENTILES
+            )
+            + f' status={",".join(map(str, result["status"]))}'
+        )
@@ -0,0 +1,78 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение пропускной способности с пулом соединений и без него: '
+        'каждый поток, как обработчик HTTP-запроса, открывает соединение, '
+        'выполняет запрос первой страницы рецептов и закрывает его. '
+        'Требует PostgreSQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Число запросов на поток.',
+        )
+
+    def handle(self, *args, **options):
+        database = connections.databases['default']
+        if connections['default'].vendor != 'postgresql':
+            raise CommandError('Сравнение пула требует PostgreSQL.')
+        sql, params = Recipe.objects.select_related('author')[
+            :settings.REST_FRAMEWORK['PAGE_SIZE']
+        ].query.sql_with_params()
+        modes = {
+            'без пула': {
+                **database,
+                'ENGINE': 'django.db.backends.postgresql',
+                'CONN_MAX_AGE': 0,
+            },
+            'с пулом': {
+                **database,
+                'ENGINE': 'foodgram.db',
+                'CONN_MAX_AGE': 0,
+                'POOL_SIZE': options['threads'],
+            },
+        }
+        results = {}
+        for name, settings_dict in modes.items():
+            results[name] = self.run(
+                settings_dict, f'benchmark-{id(settings_dict)}',
+                sql, params, options,
+            )
+            self.stdout.write(f'{name}: {results[name]:.0f} запросов/с')
+        without_pool, with_pool = results.values()
+        self.stdout.write(self.style.SUCCESS(
+            f'Ускорение с пулом: x{with_pool / without_pool:.2f}'
+        ))
+
+    def run(self, settings_dict, alias, sql, params, options):
+        backend = load_backend(settings_dict['ENGINE'])
+
+        def worker():
+            wrapper = backend.DatabaseWrapper(settings_dict, alias)
+            for _ in range(options['requests']):
+                wrapper.ensure_connection()
+                with wrapper.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                wrapper.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['threads']) as executor:
+            for future in [
+                executor.submit(worker) for _ in range(options['threads'])
+            ]:
+                future.result()
+        elapsed = time.perf_counter() - started
+        return options['threads'] * options['requests'] / elapsed
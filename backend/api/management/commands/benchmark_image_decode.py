@@ -0,0 +1,117 @@
+import base64
+import io
+import multiprocessing
+import os
+import time
+import tracemalloc
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+from rest_framework.fields import ImageField
+
+from api.serializers import Base64ImageField
+
+
+def legacy_decode(data):
+    """
+    Прежнее декодирование: split всей строки и b64decode целиком в память.
+    """
+    format, imgstr = data.split(';base64,')
+    ext = format.split('/')[-1]
+    return ImageField().to_internal_value(
+        ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+    )
+
+
+def streaming_decode(data):
+    return Base64ImageField().to_internal_value(data)
+
+
+DECODERS = {'legacy': legacy_decode, 'streaming': streaming_decode}
+
+
+def memory_kb(field):
+    """
+    Поле VmRSS/VmHWM из /proc/self/status в КиБ.
+    """
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    raise OSError(f'{field} недоступно')
+
+
+def measure(decoder, data, pipe):
+    """
+    Выполняется в отдельном процессе: пик RSS сбрасывается перед
+    декодированием, поэтому прогоны режимов не влияют друг на друга.
+    """
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+    baseline = memory_kb('VmRSS')
+    tracemalloc.start()
+    started = time.perf_counter()
+    upload = DECODERS[decoder](data)
+    elapsed = time.perf_counter() - started
+    peak_python = tracemalloc.get_traced_memory()[1]
+    peak_rss = memory_kb('VmHWM') - baseline
+    upload.close()
+    pipe.send((elapsed, peak_rss * 1024, peak_python))
+
+
+class Command(BaseCommand):
+    help = (
+        'Пиковая память процесса (RSS) и Python-аллокаций при декодировании '
+        'одного изображения base64: прежний split + b64decode и потоковое '
+        'декодирование Base64ImageField. Каждый замер - в отдельном '
+        'процессе. Требует Linux (/proc).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=float, default=4,
+            help='Размер изображения, МиБ.',
+        )
+        parser.add_argument('--iterations', type=int, default=3)
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/clear_refs'):
+            raise CommandError('Замер пика RSS требует Linux.')
+        data = self.payload(options['size'])
+        self.stdout.write(
+            f'data URL: {len(data) / 2**20:.1f} МиБ, '
+            f'изображение: {options["size"]:.1f} МиБ'
+        )
+        context = multiprocessing.get_context('fork')
+        for decoder in DECODERS:
+            results = []
+            for _ in range(options['iterations']):
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(
+                    target=measure, args=(decoder, data, sender)
+                )
+                process.start()
+                results.append(receiver.recv())
+                process.join()
+            elapsed, peak_rss, peak_python = (
+                max(values) for values in zip(*results)
+            )
+            self.stdout.write(
+                f'{decoder:<10} пик RSS +{peak_rss / 2**20:7.1f} МиБ, '
+                f'пик аллокаций Python {peak_python / 2**20:7.1f} МиБ, '
+                f'время {elapsed * 1000:7.1f} мс'
+            )
+
+    def payload(self, size):
+        """
+        PNG из шума, который почти не сжимается, в виде data URL.
+        """
+        side = int((size * 2**20 / 3) ** 0.5)
+        buffer = io.BytesIO()
+        Image.frombytes(
+            'RGB', (side, side), os.urandom(side * side * 3)
+        ).save(buffer, format='PNG', compress_level=0)
+        return 'data:image/png;base64,' + base64.b64encode(
+            buffer.getvalue()
+        ).decode()
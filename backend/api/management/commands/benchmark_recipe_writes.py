@@ -0,0 +1,126 @@
+import base64
+import io
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag, User
+from recipes.storage import delete_unreferenced_files
+
+from .benchmark_api import PERCENTILES, percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Задержка и число SQL-запросов создания (POST) и изменения (PATCH) '
+        'рецепта в зависимости от числа ингредиентов. Все изменения '
+        'откатываются в конце прогона.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ingredients', type=int, nargs='+', default=[1, 10, 30, 60],
+            help='Число ингредиентов в рецепте.',
+        )
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        user = User.objects.first()
+        tag = Tag.objects.first()
+        ingredients = list(Ingredient.objects.values_list('pk', flat=True)[
+            :max(options['ingredients']) * 2
+        ])
+        if user is None or tag is None or \
+                len(ingredients) < max(options['ingredients']) * 2:
+            raise CommandError(
+                'Недостаточно данных, заполните БД командой '
+                'seed_benchmark_data.'
+            )
+        client = APIClient()
+        client.force_authenticate(user)
+        image = self.image()
+        names = set()
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        ), transaction.atomic():
+            for count in options['ingredients']:
+                results = self.measure(
+                    client, image, tag, ingredients, count, options
+                )
+                for method, (timings, queries) in results.items():
+                    self.stdout.write(self.format_result(
+                        count, method, timings, queries
+                    ))
+            names.update(Recipe.objects.filter(
+                author=user
+            ).values_list('image', flat=True))
+            transaction.set_rollback(True)
+        delete_unreferenced_files(names, grace=0)
+
+    def image(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), 'orange').save(buffer, format='PNG')
+        return 'data:image/png;base64,' + base64.b64encode(
+            buffer.getvalue()
+        ).decode()
+
+    def measure(self, client, image, tag, ingredients, count, options):
+        """
+        Рецепт создается с count ингредиентами, затем половина
+        ингредиентов заменяется, а у остальных меняется количество.
+        """
+        created = [
+            {'id': pk, 'amount': 10} for pk in ingredients[:count]
+        ]
+        changed = [
+            {'id': pk, 'amount': 20} for pk in ingredients[:count // 2]
+        ] + [
+            {'id': pk, 'amount': 10}
+            for pk in ingredients[count:count + count - count // 2]
+        ]
+        results = {'POST': ([], []), 'PATCH': ([], [])}
+        for _ in range(options['iterations']):
+            response, timing, queries = self.request(
+                client.post, '/api/recipes/', {
+                    'name': 'Бенчмарк', 'text': 'Текст', 'cooking_time': 10,
+                    'tags': [tag.pk], 'image': image,
+                    'ingredients': created,
+                },
+            )
+            if response.status_code != 201:
+                raise CommandError(f'POST: {response.data}')
+            results['POST'][0].append(timing)
+            results['POST'][1].append(queries)
+            response, timing, queries = self.request(
+                client.patch, f'/api/recipes/{response.data["id"]}/', {
+                    'name': 'Бенчмарк', 'text': 'Текст', 'cooking_time': 10,
+                    'tags': [tag.pk], 'ingredients': changed,
+                },
+            )
+            if response.status_code != 200:
+                raise CommandError(f'PATCH: {response.data}')
+            results['PATCH'][0].append(timing)
+            results['PATCH'][1].append(queries)
+        return results
+
+    def request(self, method, url, data):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = method(url, data, format='json')
+            timing = (time.perf_counter() - started) * 1000
+        return response, timing, len(context.captured_queries)
+
+    def format_result(self, count, method, timings, queries):
+        return (
+            f'ингредиентов={count:<4} {method:<6}'
+            + ' '.join(
+                f'p{percent}={percentile(timings, percent):8.2f}ms'
+                for percent in PERCENTILES
+            )
+            + f' queries={max(queries)}'
+        )
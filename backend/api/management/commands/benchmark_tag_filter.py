@@ -0,0 +1,86 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.http import QueryDict
+
+from api.filters import RecipeFilter
+from recipes.models import Recipe, Tag
+
+from .benchmark_api import PERCENTILES, percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение фильтра по тегам через EXISTS (RecipeFilter) со старым '
+        'JOIN по tags__slug с DISTINCT: COUNT(*) и первая страница '
+        'при выборе нескольких тегов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tags', type=int, nargs='+', default=[3, 4, 5],
+            help='Число выбранных тегов.',
+        )
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        slugs = list(Tag.objects.annotate(
+            recipes_count=Count('recipe')
+        ).order_by('-recipes_count').values_list('slug', flat=True)[
+            :max(options['tags'])
+        ])
+        if len(slugs) < max(options['tags']):
+            raise CommandError(
+                'Недостаточно тегов, заполните БД командой '
+                'seed_benchmark_data.'
+            )
+        for count in options['tags']:
+            selected = slugs[:count]
+            joined = Recipe.objects.filter(tags__slug__in=selected)
+            plans = {
+                'join': joined.distinct(),
+                'exists': self.filtered(selected),
+            }
+            results = {
+                name: self.measure(queryset, options)
+                for name, queryset in plans.items()
+            }
+            if results['join'][0] != results['exists'][0]:
+                raise CommandError(
+                    f'Тегов {count}: результаты фильтров различаются.'
+                )
+            self.stdout.write(
+                f'тегов={count} рецептов={results["exists"][0][0]} '
+                f'строк JOIN без DISTINCT={joined.count()}'
+            )
+            for name, (_, timings) in results.items():
+                self.stdout.write(f'  {name:<7}' + ' '.join(
+                    f'p{percent}={percentile(timings, percent):8.2f}ms'
+                    for percent in PERCENTILES
+                ))
+
+    def filtered(self, slugs):
+        data = QueryDict(mutable=True)
+        data.setlist('tags', slugs)
+        filterset = RecipeFilter(data, queryset=Recipe.objects.all())
+        if not filterset.is_valid():
+            raise CommandError(str(filterset.errors))
+        return filterset.qs
+
+    def measure(self, queryset, options):
+        """
+        COUNT(*) и id первой страницы, как у постраничного списка.
+        """
+        timings = []
+        for _ in range(options['iterations']):
+            started = time.perf_counter()
+            result = (
+                queryset.count(),
+                list(queryset.values_list('pk', flat=True)[
+                    :settings.REST_FRAMEWORK['PAGE_SIZE']
+                ]),
+            )
+            timings.append((time.perf_counter() - started) * 1000)
+        return result, timings
@@ -0,0 +1,211 @@
+import ipaddress
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from threading import Lock
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from foodgram.db.pool import pool_stats
+
+from .caching import recipes_cache_stats
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+# Соединения с БД общие для запросов одного потока, а под ASGI
+# в одном потоке чередуются разные запросы. Поэтому обертка у каждого
+# соединения одна, а SQL учитывается в recorder текущего запроса
+# из контекста, который видят и потоки асинхронных представлений.
+current_recorder = ContextVar('current_recorder', default=None)
+
+
+class QueryRecorder:
+    """
+    Учет SQL одного запроса: время в БД, число запросов и повторы
+    одного и того же SQL с разными параметрами - признак N+1.
+    """
+
+    def __init__(self):
+        self.duration = 0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.statements[sql] += 1
+
+    @property
+    def count(self):
+        return sum(self.statements.values())
+
+    @property
+    def duplicates(self):
+        return self.count - len(self.statements)
+
+
+def record_query(execute, sql, params, many, context):
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    Обертка подключается к соединению один раз, при первом открытии.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class MetricsRegistry:
+    """
+    Счетчики запросов по представлениям в памяти процесса.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.requests = Counter()
+        self.duration = defaultdict(float)
+        self.buckets = defaultdict(Counter)
+        self.db_duration = defaultdict(float)
+        self.queries = Counter()
+        self.duplicates = Counter()
+        self.n_plus_one = Counter()
+
+    def observe(self, view, method, status, duration, recorder, n_plus_one):
+        with self.lock:
+            self.requests[view, method, status] += 1
+            self.duration[view] += duration
+            for bucket in DURATION_BUCKETS:
+                if duration <= bucket:
+                    self.buckets[view][bucket] += 1
+            self.db_duration[view] += recorder.duration
+            self.queries[view] += recorder.count
+            self.duplicates[view] += recorder.duplicates
+            if n_plus_one:
+                self.n_plus_one[view] += 1
+
+    def render(self):
+        """
+        Метрики в текстовом формате Prometheus.
+        """
+        with self.lock:
+            requests = dict(self.requests)
+            views = {view for view, _, _ in requests}
+            counts = Counter()
+            for (view, _, _), count in requests.items():
+                counts[view] += count
+            lines = [
+                '# TYPE foodgram_requests_total counter',
+                *(
+                    f'foodgram_requests_total{{view="{view}",'
+                    f'method="{method}",status="{status}"}} {count}'
+                    for (view, method, status), count
+                    in sorted(requests.items())
+                ),
+                '# TYPE foodgram_request_duration_seconds histogram',
+            ]
+            for view in sorted(views):
+                lines.extend(
+                    f'foodgram_request_duration_seconds_bucket'
+                    f'{{view="{view}",le="{bucket}"}} '
+                    f'{self.buckets[view][bucket]}'
+                    for bucket in DURATION_BUCKETS
+                )
+                lines.extend((
+                    f'foodgram_request_duration_seconds_bucket'
+                    f'{{view="{view}",le="+Inf"}} {counts[view]}',
+                    f'foodgram_request_duration_seconds_sum'
+                    f'{{view="{view}"}} {self.duration[view]:.6f}',
+                    f'foodgram_request_duration_seconds_count'
+                    f'{{view="{view}"}} {counts[view]}',
+                ))
+            for name, kind, values in (
+                ('db_duration_seconds_total', 'counter', self.db_duration),
+                ('db_queries_total', 'counter', self.queries),
+                ('db_duplicate_queries_total', 'counter', self.duplicates),
+                ('n_plus_one_total', 'counter', self.n_plus_one),
+            ):
+                lines.append(f'# TYPE foodgram_{name} {kind}')
+                lines.extend(
+                    f'foodgram_{name}{{view="{view}"}} {values[view]}'
+                    for view in sorted(views)
+                )
+        stats = recipes_cache_stats()
+        lines.append('# TYPE foodgram_recipes_cache_total counter')
+        lines.extend(
+            f'foodgram_recipes_cache_total{{result="{result}"}} {count}'
+            for result, count in stats.items()
+        )
+        lines.extend(render_pool_stats(pool_stats()))
+        return '\n'.join(lines) + '\n'
+
+
+def render_pool_stats(stats):
+    """
+    Состояние пулов соединений с БД в формате Prometheus.
+    """
+    for name, kind in (
+        ('size', 'gauge'),
+        ('in_use', 'gauge'),
+        ('idle', 'gauge'),
+        ('waiting', 'gauge'),
+        ('created', 'counter'),
+        ('discarded', 'counter'),
+        ('timeouts', 'counter'),
+    ):
+        metric = f'foodgram_db_pool_{name}'
+        if kind == 'counter':
+            metric += '_total'
+        yield f'# TYPE {metric} {kind}'
+        for (alias, database), values in sorted(stats.items()):
+            yield (
+                f'{metric}{{alias="{alias}",database="{database}"}} '
+                f'{values[name]}'
+            )
+
+
+registry = MetricsRegistry()
+
+
+def metrics_allowed(request):
+    """
+    Метрики отдаются по токену METRICS_TOKEN в заголовке
+    Authorization: Bearer или адресам из METRICS_ALLOWED_IPS.
+    """
+    token = settings.METRICS_TOKEN
+    if token and constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    ):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in settings.METRICS_ALLOWED_IPS
+    )
+
+
+def metrics_view(request):
+    """
+    Эндпоинт для Prometheus. Доступен только при METRICS_ENABLED
+    и только разрешенным клиентам, остальным - 404.
+    """
+    if not settings.METRICS_ENABLED or not metrics_allowed(request):
+        return HttpResponse(status=404)
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import logging
+import time
+from hashlib import sha256
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.deprecation import MiddlewareMixin
+
+from foodgram.db.router import read_database, use_replica
+
+from .metrics import QueryRecorder, current_recorder, registry
+
+
+logger = logging.getLogger('api.metrics')
+
+
+def view_name(view_func, method):
+    """
+    Имя представления для метрик: ViewSet.action для DRF,
+    модуль.функция для остальных.
+    """
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+    return f'{cls.__name__}.{action}'
+
+
+class StreamingContent:
+    """
+    Тело потокового ответа, которое вызывает on_close, когда сервер
+    закрывает ответ, даже если тело не было прочитано.
+    """
+
+    def __init__(self, content, on_close):
+        self.content = content
+        self.on_close = on_close
+
+    def __iter__(self):
+        return iter(self.content)
+
+    def close(self):
+        self.on_close()
+
+
+class RequestMetricsMiddleware(MiddlewareMixin):
+    """
+    Время ответа, время в БД, число запросов и повторов SQL для
+    каждого представления: заголовок Server-Timing, строка лога
+    в JSON и счетчики для /metrics. Много повторов одного запроса
+    записывается в лог как предупреждение о N+1.
+    """
+
+    def process_request(self, request):
+        request.metrics_started = time.perf_counter()
+        request.metrics_view = 'unresolved'
+        request.query_recorder = QueryRecorder()
+        current_recorder.set(request.query_recorder)
+
+    def process_response(self, request, response):
+        started, recorder = request.metrics_started, request.query_recorder
+        response['Server-Timing'] = ', '.join((
+            f'app;dur={(time.perf_counter() - started) * 1000:.1f}',
+            f'db;dur={recorder.duration * 1000:.1f}',
+            f'db-queries;desc="{recorder.count}"',
+            f'db-duplicates;desc="{recorder.duplicates}"',
+        ))
+        if response.streaming:
+            # Запросы потокового ответа выполняются при отдаче тела.
+            response.streaming_content = StreamingContent(
+                response.streaming_content,
+                lambda: self.finish(request, response, started, recorder),
+            )
+        else:
+            self.finish(request, response, started, recorder)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = view_name(view_func, request.method)
+
+    def finish(self, request, response, started, recorder):
+        # Под WSGI контекст потока переходит к следующему запросу.
+        current_recorder.set(None)
+        duration = time.perf_counter() - started
+        n_plus_one = (
+            recorder.duplicates >= settings.METRICS_DUPLICATE_QUERIES_ALERT
+        )
+        registry.observe(
+            request.metrics_view, request.method, response.status_code,
+            duration, recorder, n_plus_one,
+        )
+        record = {
+            'view': request.metrics_view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'db_ms': round(recorder.duration * 1000, 1),
+            'queries': recorder.count,
+            'duplicate_queries': recorder.duplicates,
+        }
+        logger.info(json.dumps(record))
+        if n_plus_one:
+            sql, count = recorder.statements.most_common(1)[0]
+            logger.warning(json.dumps({
+                **record,
+                'alert': 'n_plus_one',
+                'repeated_sql': sql,
+                'repeated_count': count,
+            }))
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """
+    Безопасные запросы читают с реплики, остальные - с основной БД.
+    После запроса с записью клиент еще DATABASE_REPLICA_STICKY_SECONDS
+    секунд читает с основной БД, чтобы не потерять только что
+    созданные рецепты, подписки и избранное из-за отставания реплик.
+    Клиент определяется по токену или сессии. Реплика выбирается
+    в контексте запроса, поэтому ее видят и потоки асинхронных
+    представлений.
+    """
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.acall(request)
+        key = self.sticky_key(request)
+        token = self.route(request, key and cache.get(key))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_database.reset(token)
+        if request.method not in self.safe_methods:
+            cache.set_many(
+                self.sticky_keys(request, response),
+                timeout=settings.DATABASE_REPLICA_STICKY_SECONDS,
+            )
+        return response
+
+    async def acall(self, request):
+        key = self.sticky_key(request)
+        token = self.route(
+            request, key and await sync_to_async(cache.get)(key)
+        )
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_database.reset(token)
+        if request.method not in self.safe_methods:
+            await sync_to_async(cache.set_many)(
+                self.sticky_keys(request, response),
+                timeout=settings.DATABASE_REPLICA_STICKY_SECONDS,
+            )
+        return response
+
+    def route(self, request, sticky):
+        if request.method in self.safe_methods and not sticky:
+            return use_replica()
+        return read_database.set(None)
+
+    def sticky_key(self, request):
+        credentials = request.META.get('HTTP_AUTHORIZATION') or \
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        if not credentials or not settings.DATABASE_REPLICAS:
+            return None
+        return self.key_for(credentials)
+
+    def sticky_keys(self, request, response):
+        """
+        Ключи клиентов, которые должны читать с основной БД после
+        запроса с записью: по токену и сессии запроса, а также по
+        токену или сессии, выданным в ответе при входе.
+        """
+        if not settings.DATABASE_REPLICAS:
+            return {}
+        credentials = [
+            request.META.get('HTTP_AUTHORIZATION'),
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME),
+        ]
+        data = getattr(response, 'data', None)
+        if isinstance(data, dict) and data.get('auth_token'):
+            credentials.append(f'Token {data["auth_token"]}')
+        session = response.cookies.get(settings.SESSION_COOKIE_NAME)
+        if session is not None and session.value:
+            credentials.append(session.value)
+        return {
+            self.key_for(value): True for value in credentials if value
+        }
+
+    def key_for(self, credentials):
+        return 'db-primary:' + sha256(credentials.encode()).hexdigest()
@@ -1,5 +1,123 @@
-from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, \
+    CursorPagination, Cursor
+
+from recipes.queries import estimate_count
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор с оценкой количества вместо COUNT(*) на больших таблицах,
+    включается настройкой ESTIMATED_COUNT.
+    """
+
+    @cached_property
+    def count(self):
+        if settings.ESTIMATED_COUNT:
+            return estimate_count(self.object_list)
+        return super().count
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(CursorPagination):
+    """
+    Пагинация по ключу (publish_date, id) без OFFSET и COUNT(*).
+    CursorPagination из DRF сравнивает только первое поле сортировки
+    и добирает одинаковые даты смещением, здесь в курсоре весь ключ
+    и страница выбирается сравнением пары: publish_date < x
+    OR (publish_date = x AND id < y).
+    """
+    ordering = ('-publish_date', '-id')
+    page_size_query_param = 'limit'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        queryset = queryset.order_by(*self.ordering)
+        reverse = self.cursor is not None and self.cursor.reverse
+        if self.cursor is not None:
+            publish_date, pk = self.parse_position(self.cursor.position)
+            if reverse:
+                queryset = queryset.filter(
+                    Q(publish_date__gt=publish_date)
+                    | Q(publish_date=publish_date, id__gt=pk)
+                ).reverse()
+            else:
+                # publish_date <= x ограничивает просмотр индекса,
+                # OR уточняет границу внутри одной даты.
+                queryset = queryset.filter(
+                    Q(publish_date__lt=publish_date)
+                    | Q(publish_date=publish_date, id__lt=pk),
+                    publish_date__lte=publish_date,
+                )
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = bool(self.page), has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None and bool(self.page)
+        return self.page
+
+    def parse_position(self, position):
+        try:
+            publish_date, pk = position.rsplit('|', 1)
+            publish_date, pk = parse_datetime(publish_date), int(pk)
+        except (AttributeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if publish_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return publish_date, pk
+
+    def position(self, instance):
+        return f'{instance.publish_date.isoformat()}|{instance.pk}'
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=False, position=self.position(self.page[-1])
+        ))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=True, position=self.position(self.page[0])
+        ))
+
+
+class RecipePagination(CustomPagination):
+    """
+    Постраничный вывод рецептов. По умолчанию - номера страниц,
+    с ?pagination=cursor - пагинация по ключу.
+    """
+    django_paginator_class = EstimatedCountPaginator
+    mode_query_param = 'pagination'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_pagination = None
+        if request.query_params.get(self.mode_query_param) == 'cursor':
+            self.cursor_pagination = RecipeCursorPagination()
+            return self.cursor_pagination.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,31 @@
+from rest_framework.renderers import JSONRenderer
+
+
+class ShoppingListRenderer(JSONRenderer):
+    """
+    Выбор формата списка покупок через ?format=.
+    Сам файл отдается потоково, рендерер форматирует только ошибки,
+    и они отдаются как JSON.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return super().render(data, 'application/json', renderer_context)
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
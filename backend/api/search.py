@@ -0,0 +1,69 @@
+from bisect import bisect_left
+from itertools import islice
+from threading import Lock
+
+from foodgram.db.router import read_primary_after
+from recipes.models import Ingredient
+from recipes.versions import get_version
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов в памяти процесса для автодополнения.
+    Строится лениво и перестраивается при смене версии 'ingredients'.
+    Результаты совпадают с IngredientFilter.filter_name: сначала
+    совпадения с начала названия, затем остальные, в порядке из БД.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.data = ([], [], [])
+        self.lock = Lock()
+
+    def build(self):
+        """
+        Строки ингредиентов, названия в верхнем регистре и отсортированные
+        пары (название, позиция) для поиска по началу через bisect.
+        """
+        rows = list(
+            Ingredient.objects.order_by('name').values(
+                'id', 'name', 'measurement_unit'
+            )
+        )
+        keys = [row['name'].upper() for row in rows]
+        prefix_keys = sorted(
+            (key, position) for position, key in enumerate(keys)
+        )
+        return rows, keys, prefix_keys
+
+    def refresh(self):
+        version = get_version('ingredients')
+        if version == self.version:
+            return
+        with self.lock:
+            if version != self.version:
+                with read_primary_after(version):
+                    self.data = self.build()
+                self.version = version
+
+    def search(self, value, limit):
+        self.refresh()
+        rows, keys, prefix_keys = self.data
+        value = value.upper()
+        start = bisect_left(prefix_keys, (value,))
+        found = []
+        for key, position in islice(prefix_keys, start, None):
+            if not key.startswith(value):
+                break
+            found.append(position)
+        found.sort()
+        if len(found) < limit:
+            prefix = set(found)
+            found.extend(
+                position for position, key in enumerate(keys)
+                if value in key and position not in prefix
+            )
+        return [rows[position] for position in found[:limit]]
+
+
+ingredient_index = IngredientIndex()
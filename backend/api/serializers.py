@@ -1,16 +1,19 @@
-import base64
+from collections import Counter
 
 from rest_framework.serializers import ModelSerializer, ImageField, \
     CharField, ReadOnlyField, SerializerMethodField, URLField, \
     PrimaryKeyRelatedField, ValidationError
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.db import transaction
 from djoser.serializers import UserCreateSerializer \
     as BaseUserCreateSerializer
 from djoser.serializers import SetPasswordSerializer \
     as BaseSetPasswordSerializer
 
+from recipes.images import schedule_renditions, decode_base64_image, \
+    base64_decoded_size
 from recipes.models import Tag, Recipe, Ingredient, RecipeIngredient, \
-    User, Subscription, FavoriteRecipe, ShoppingCart
+    User, Subscription, FavoriteRecipe, ShoppingCart, ShoppingCartIngredient
 
 
 class UserSerializer(ModelSerializer):
@@ -33,16 +36,16 @@ class UserSerializer(ModelSerializer):
     def get_is_subscribed(self, instance):
         """
         Возвращает статус подписки текущего пользователя.
+        Если queryset аннотирован, дополнительный запрос не выполняется.
         """
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
-        return (
-            Subscription.objects.filter(
-                author=instance, subscriber=request.user
-            ).exists()
-            and request.user.is_authenticated
-        )
+        if hasattr(instance, 'is_subscribed'):
+            return instance.is_subscribed
+        return Subscription.objects.filter(
+            author=instance, subscriber=request.user
+        ).exists()
 
 
 class UserCreateSerializer(BaseUserCreateSerializer):
@@ -105,16 +108,39 @@ class RecipeIngredientSerializer(ModelSerializer):
 
 class Base64ImageField(ImageField):
     """
-    Для загрузки изображения рецепта.
+    Для загрузки изображения рецепта. Размер проверяется до декодирования,
+    base64 декодируется кусками во временный файл.
     """
     def to_internal_value(self, data):
+        max_bytes = settings.RECIPE_IMAGE_MAX_BYTES
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
+            start = data.find(';base64,')
+            if start == -1:
+                self.fail('invalid_image')
+            start += len(';base64,')
+            if base64_decoded_size(data, start) > max_bytes:
+                raise ValidationError(
+                    f'Размер изображения больше {max_bytes} байт.'
+                )
+            try:
+                data = decode_base64_image(data, start)
+            except ValueError:
+                self.fail('invalid_image')
+
+        if getattr(data, 'size', 0) > max_bytes:
+            raise ValidationError(
+                f'Размер изображения больше {max_bytes} байт.'
+            )
+        return super().to_internal_value(data)
 
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
 
-        return super().to_internal_value(data)
+class RenditionURLField(ReadOnlyField):
+    """
+    Адрес уменьшенной копии изображения, None пока копия не построена.
+    """
+
+    def to_representation(self, value):
+        return value.url if value else None
 
 
 class RecipeSerializer(ModelSerializer):
@@ -131,19 +157,30 @@ class RecipeSerializer(ModelSerializer):
     image = URLField(
         source='image.url', required=False, allow_null=True
     )
+    image_thumbnail = RenditionURLField()
+    image_card = RenditionURLField()
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        # Счетчики избранного и корзин не входят в ответ: они меняются
+        # F-выражениями без смены версий кэша рецептов.
+        fields = (
+            'id', 'tags', 'ingredients', 'author', 'is_favorited',
+            'is_in_shopping_cart', 'image', 'image_thumbnail', 'image_card',
+            'name', 'text', 'cooking_time', 'publish_date',
+        )
         read_only_fields = ('author',)
 
     def get_is_favorited(self, instance):
         """
         Возвращает статус избранного рецепта.
+        Если queryset аннотирован, дополнительный запрос не выполняется.
         """
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
+        if hasattr(instance, 'favorited'):
+            return instance.favorited
         return FavoriteRecipe.objects.filter(
             recipe=instance, user=request.user
         ).exists()
@@ -151,10 +188,13 @@ class RecipeSerializer(ModelSerializer):
     def get_is_in_shopping_cart(self, instance):
         """
         Возвращает статус рецепта в корзине.
+        Если queryset аннотирован, дополнительный запрос не выполняется.
         """
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
+        if hasattr(instance, 'in_shopping_cart'):
+            return instance.in_shopping_cart
         return ShoppingCart.objects.filter(
             recipe=instance, user=request.user
         ).exists()
@@ -167,10 +207,11 @@ class SubscriptionRecipeSerializer(ModelSerializer):
     image = URLField(
         source='image.url', required=False, allow_null=True
     )
+    image_thumbnail = RenditionURLField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_thumbnail', 'cooking_time')
 
 
 class SubscriptionSerializer(ModelSerializer):
@@ -203,8 +244,12 @@ class SubscriptionSerializer(ModelSerializer):
 
     def get_recipes_count(self, instance):
         """
-        Подсчет количеста рецептов автора
+        Количество рецептов автора из счетчика UserStats.
+        Если счетчика еще нет, рецепты считаются запросом.
         """
+        stats = getattr(instance.author, 'stats', None)
+        if stats is not None:
+            return stats.recipes_count
         return instance.author.recipes.count()
 
 
@@ -240,11 +285,26 @@ class ShopingCartSerializer(ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
+class IngredientIdField(PrimaryKeyRelatedField):
+    """
+    Id ингредиента без запроса к БД. Ингредиенты рецепта проверяются
+    одним запросом в RecipeCreateSerializer.validate_ingredients.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
 class RecipeIngredientsCreateSerializer(ModelSerializer):
     """
     Для обработки связанной таблици ингредиентов при создании рецепта.
     """
-    id = PrimaryKeyRelatedField(
+    id = IngredientIdField(
         source='ingredient',
         queryset=Ingredient.objects.all(),
     )
@@ -285,35 +345,105 @@ class RecipeCreateSerializer(ModelSerializer):
             'image'
         )
 
+    def save(self, **kwargs):
+        """
+        Временный файл декодированного изображения закрывается
+        сразу после сохранения рецепта.
+        """
+        try:
+            return super().save(**kwargs)
+        finally:
+            image = self.validated_data.get('image')
+            if image is not None:
+                image.close()
+
+    @transaction.atomic
     def create(self, validated_data):
         """
         Переопределен метод, т.к. джанго не умеет добавлять записи
-        в связанные модели.
+        в связанные модели. Ингредиенты сохраняются одним запросом.
         """
         ingredients = validated_data.pop('recipe_ingredients')
         recipe = super().create(validated_data)
-        for ingredient_data in ingredients:
-            RecipeIngredient.objects.create(recipe=recipe, **ingredient_data)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, **ingredient_data)
+            for ingredient_data in ingredients
+        )
+        schedule_renditions(recipe.pk)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """
         Переопределен метод, т.к. джанго не умеет добавлять записи
-        в связанные модели.
+        в связанные модели. Изменяются только отличающиеся строки
+        ингредиентов, итоги корзин с рецептом пересчитываются
+        в той же транзакции.
         """
         ingredients = validated_data.pop('recipe_ingredients')
+        if 'image' in validated_data:
+            validated_data.update(image_thumbnail='', image_card='')
+            schedule_renditions(instance.pk)
         super().update(instance, validated_data)
-        RecipeIngredient.objects.filter(recipe=instance).delete()
+        current = {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(recipe=instance)
+        }
+        delta = Counter()
+        to_create, to_update = [], []
         for ingredient_data in ingredients:
-            RecipeIngredient.objects.create(recipe=instance, **ingredient_data)
+            ingredient, amount = (
+                ingredient_data['ingredient'], ingredient_data['amount']
+            )
+            delta[ingredient.pk] += amount
+            row = current.pop(ingredient.pk, None)
+            if row is None:
+                to_create.append(RecipeIngredient(
+                    recipe=instance, ingredient=ingredient, amount=amount
+                ))
+                continue
+            delta[ingredient.pk] -= row.amount
+            if row.amount != amount:
+                row.amount = amount
+                to_update.append(row)
+        # итоги корзин для удаленных строк вычитает сигнал post_delete
+        RecipeIngredient.objects.filter(
+            pk__in=[row.pk for row in current.values()]
+        ).delete()
+        RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        RecipeIngredient.objects.bulk_create(to_create)
+        ShoppingCartIngredient.objects.apply_delta(
+            ShoppingCartIngredient.objects.recipe_users(instance.pk), delta
+        )
         return instance
 
     def validate_ingredients(self, value):
         """
-        Валидация ингредиентов. Рецепт не может быть без ингредиентов.
+        Валидация ингредиентов. Рецепт не может быть без ингредиентов,
+        ингредиенты не повторяются и существуют в БД. Все id проверяются
+        одним запросом, в validated_data попадают объекты ингредиентов.
         """
         if not value:
             raise ValidationError('Добавьте ингредиенты.')
+        ingredients = Ingredient.objects.in_bulk(
+            {item['ingredient'] for item in value}
+        )
+        does_not_exist = self.fields['ingredients'].child.fields[
+            'id'
+        ].error_messages['does_not_exist']
+        errors, seen = [], set()
+        for item in value:
+            pk = item['ingredient']
+            if pk not in ingredients:
+                errors.append({'id': [does_not_exist.format(pk_value=pk)]})
+            elif pk in seen:
+                errors.append({'id': ['Ингредиенты не должны повторяться.']})
+            else:
+                errors.append({})
+            seen.add(pk)
+            item['ingredient'] = ingredients.get(pk)
+        if any(errors):
+            raise ValidationError(errors)
         return value
 
     def validate_cooking_time(self, value):
@@ -0,0 +1,76 @@
+from asgiref.testing import ApplicationCommunicator
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+
+from foodgram.asgi import application
+from recipes.models import Ingredient, ShoppingCartIngredient, User
+
+
+class ASGITest(TestCase):
+    """
+    Запросы через ASGI-приложение проекта, как у сервера под ASGI.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='reader', email='r@r.ru')
+        cls.token = Token.objects.create(user=user).key
+        ShoppingCartIngredient.objects.bulk_create(
+            ShoppingCartIngredient(
+                user=user, amount=number + 1,
+                ingredient=Ingredient.objects.create(
+                    name=f'Продукт {number}', measurement_unit='г'
+                ),
+            )
+            for number in range(3)
+        )
+
+    def setUp(self):
+        # Как тестовый клиент: соединение внутри транзакции теста
+        # не должно закрываться в начале и конце запроса.
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+
+    async def get(self, path, query_string=''):
+        communicator = ApplicationCommunicator(application, {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': query_string.encode(),
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'Token {self.token}'.encode()),
+            ],
+        })
+        await communicator.send_input({'type': 'http.request'})
+        start = await communicator.receive_output()
+        body = b''
+        while True:
+            message = await communicator.receive_output()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        await communicator.wait()
+        return start['status'], dict(start['headers']), body
+
+    async def test_download_shopping_cart(self):
+        for file_format, content_type in (
+            ('csv', b'text/csv; charset=utf-8'),
+            ('txt', b'text/plain; charset=utf-8'),
+            ('pdf', b'application/pdf'),
+        ):
+            with self.subTest(format=file_format):
+                status, headers, body = await self.get(
+                    '/api/recipes/download_shopping_cart/',
+                    f'format={file_format}',
+                )
+                self.assertEqual(status, 200)
+                self.assertEqual(headers[b'Content-Type'], content_type)
+                if file_format == 'pdf':
+                    self.assertTrue(body.startswith(b'%PDF'))
+                else:
+                    self.assertIn('Продукт 2'.encode(), body)
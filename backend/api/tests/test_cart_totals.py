@@ -0,0 +1,182 @@
+import threading
+from unittest import skipUnless
+
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, \
+    ShoppingCart, ShoppingCartIngredient, User
+
+
+class CartTotalsTest(TestCase):
+    """
+    Итоги корзин совпадают с пересчитанными заново при любых изменениях
+    корзин и ингредиентов, включая админку и каскадное удаление.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create(username=f'user{i}', email=f'u{i}@u.ru')
+            for i in range(2)
+        ]
+        cls.salt, cls.sugar, cls.flour = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('соль', 'сахар', 'мука')
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.users[0], name=f'Рецепт {i}', text='Текст',
+                cooking_time=10, image='images/recipe.png',
+            )
+            for i in range(2)
+        ]
+        for recipe in cls.recipes:
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=cls.salt, amount=5
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=cls.sugar, amount=10
+            )
+
+    def assertTotals(self, expected):
+        totals = {
+            (row['user'], row['ingredient']): row['amount']
+            for row in ShoppingCartIngredient.objects.values(
+                'user', 'ingredient', 'amount'
+            )
+        }
+        self.assertEqual(totals, {
+            (row['user'], row['ingredient']): row['amount']
+            for row in ShoppingCartIngredient.objects.expected_totals()
+        })
+        self.assertEqual(totals, expected)
+
+    def fill_carts(self):
+        for user in self.users:
+            for recipe in self.recipes:
+                ShoppingCart.objects.create(user=user, recipe=recipe)
+
+    def test_cart_rows(self):
+        user = self.users[0]
+        ShoppingCart.objects.create(user=user, recipe=self.recipes[0])
+        cart = ShoppingCart.objects.create(user=user, recipe=self.recipes[1])
+        self.assertTotals({
+            (user.pk, self.salt.pk): 10, (user.pk, self.sugar.pk): 20,
+        })
+        cart.delete()
+        self.assertTotals({
+            (user.pk, self.salt.pk): 5, (user.pk, self.sugar.pk): 10,
+        })
+        ShoppingCart.objects.filter(user=user).delete()
+        self.assertTotals({})
+
+    def test_recipe_ingredient_rows(self):
+        self.fill_carts()
+        recipe = self.recipes[0]
+        row = RecipeIngredient.objects.get(recipe=recipe, ingredient=self.salt)
+        row.amount = 7
+        row.save()
+        row.ingredient = self.flour
+        row.save()
+        RecipeIngredient.objects.filter(
+            recipe=recipe, ingredient=self.sugar
+        ).delete()
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=self.salt, amount=1
+        )
+        self.assertTotals({
+            key: amount
+            for user in self.users
+            for key, amount in (
+                ((user.pk, self.salt.pk), 6),
+                ((user.pk, self.sugar.pk), 10),
+                ((user.pk, self.flour.pk), 7),
+            )
+        })
+
+    def test_recipe_delete_cascade(self):
+        self.fill_carts()
+        self.recipes[0].delete()
+        self.assertTotals({
+            key: amount
+            for user in self.users
+            for key, amount in (
+                ((user.pk, self.salt.pk), 5),
+                ((user.pk, self.sugar.pk), 10),
+            )
+        })
+        User.objects.filter(pk=self.users[0].pk).delete()
+        self.assertTotals({})
+
+    def test_api(self):
+        user = self.users[0]
+        client = APIClient()
+        client.force_authenticate(user)
+        recipe = self.recipes[0]
+        url = f'/api/recipes/{recipe.pk}/'
+        response = client.post(url + 'shopping_cart/')
+        self.assertEqual(response.status_code, 201)
+        response = client.patch(url, {'ingredients': [
+            {'id': self.salt.pk, 'amount': 1},
+            {'id': self.flour.pk, 'amount': 2},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTotals({
+            (user.pk, self.salt.pk): 1, (user.pk, self.flour.pk): 2,
+        })
+        response = client.delete(url + 'shopping_cart/')
+        self.assertEqual(response.status_code, 204)
+        self.assertTotals({})
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Гонка строк в PostgreSQL.')
+class CartTotalsConcurrencyTest(TransactionTestCase):
+    """
+    Параллельные добавления рецептов с общим ингредиентом не падают
+    на уникальности итогов и не теряют изменений.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username='user', email='u@u.ru')
+        salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        self.recipes = []
+        for number in range(8):
+            recipe = Recipe.objects.create(
+                author=self.user, name=f'Рецепт {number}', text='Текст',
+                cooking_time=10, image='images/recipe.png',
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=salt, amount=1
+            )
+            self.recipes.append(recipe)
+
+    def test_concurrent_add(self):
+        barrier = threading.Barrier(len(self.recipes))
+        errors = []
+
+        def add(recipe):
+            try:
+                barrier.wait()
+                ShoppingCart.objects.create(user=self.user, recipe=recipe)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=add, args=(recipe,))
+            for recipe in self.recipes
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            list(ShoppingCartIngredient.objects.values_list(
+                'amount', flat=True
+            )),
+            [len(self.recipes)],
+        )
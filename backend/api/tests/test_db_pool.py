@@ -0,0 +1,83 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.utils import load_backend
+from django.test import TestCase
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from foodgram.db.pool import PoolTimeout, pools
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Пул работает с PostgreSQL.')
+class ConnectionPoolTest(TestCase):
+    """
+    Пул соединений на настоящем PostgreSQL.
+    """
+
+    def setUp(self):
+        self.alias = f'pool-{self._testMethodName}'
+        self.key = (self.alias, connection.settings_dict['NAME'])
+        self.addCleanup(lambda: pools.pop(self.key).close())
+
+    def wrapper(self, **settings):
+        settings_dict = {
+            **connection.settings_dict,
+            'ENGINE': 'foodgram.db',
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': True,
+            'POOL_SIZE': 1,
+            'POOL_TIMEOUT': 0.1,
+            **settings,
+        }
+        wrapper = load_backend('foodgram.db').DatabaseWrapper(
+            settings_dict, self.alias
+        )
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def backend_pid(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            return cursor.fetchone()[0]
+
+    def test_connection_is_reused(self):
+        wrapper = self.wrapper()
+        pid = self.backend_pid(wrapper)
+        wrapper.close()
+        self.assertEqual(self.backend_pid(wrapper), pid)
+        self.assertEqual(pools[self.key].stats()['created'], 1)
+
+    def test_released_connection_is_clean(self):
+        wrapper = self.wrapper()
+        wrapper.set_autocommit(False)
+        with wrapper.cursor() as cursor:
+            cursor.execute("SET application_name = 'dirty'")
+            cursor.execute('SELECT 1')
+        wrapper.close()
+        wrapper.ensure_connection()
+        self.assertTrue(wrapper.get_autocommit())
+        self.assertEqual(
+            wrapper.connection.get_transaction_status(),
+            TRANSACTION_STATUS_IDLE,
+        )
+        with wrapper.cursor() as cursor:
+            cursor.execute('SHOW application_name')
+            self.assertNotEqual(cursor.fetchone()[0], 'dirty')
+
+    def test_dropped_connection_is_replaced(self):
+        wrapper = self.wrapper()
+        pid = self.backend_pid(wrapper)
+        wrapper.close()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+        self.assertNotEqual(self.backend_pid(wrapper), pid)
+        self.assertEqual(pools[self.key].stats()['discarded'], 1)
+
+    def test_exhausted_pool_times_out(self):
+        first, second = self.wrapper(), self.wrapper()
+        first.ensure_connection()
+        with self.assertRaises(PoolTimeout):
+            second.ensure_connection()
+        first.close()
+        second.ensure_connection()
+        self.assertEqual(pools[self.key].stats()['timeouts'], 1)
@@ -0,0 +1,57 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from PIL import Image
+
+from recipes.models import Recipe, User
+
+
+class BuildImageRenditionsTest(TestCase):
+    """
+    Отсутствующее или поврежденное изображение не останавливает
+    построение копий для остальных рецептов.
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def test_broken_images_are_skipped(self):
+        buffer = BytesIO()
+        Image.new('RGB', (64, 64), 'orange').save(buffer, format='PNG')
+        images = [
+            default_storage.save('images/good.png', ContentFile(
+                buffer.getvalue()
+            )),
+            default_storage.save('images/bad.png', ContentFile(b'bad')),
+            'images/missing.png',
+        ]
+        author = User.objects.create(username='author', email='a@a.ru')
+        recipes = [
+            Recipe.objects.create(
+                author=author, name='Рецепт', text='Текст',
+                cooking_time=10, image=image,
+            )
+            for image in images
+        ]
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            'build_image_renditions', stdout=stdout, stderr=stderr
+        )
+        self.assertIn(
+            'Обработано рецептов: 3, с ошибками: 2', stdout.getvalue()
+        )
+        for recipe in recipes[1:]:
+            self.assertIn(f'Пропущен рецепт {recipe.pk}', stderr.getvalue())
+        recipes[0].refresh_from_db()
+        self.assertTrue(recipes[0].image_thumbnail)
+        self.assertTrue(recipes[0].image_card)
@@ -0,0 +1,67 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.models import Ingredient
+
+
+class ImportIngredientsTest(TestCase):
+    """
+    Импорт считает только действительно добавленные строки, а строки
+    без пары значений пропускает. На PostgreSQL идет через COPY.
+    """
+
+    def setUp(self):
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def run_import(self, name, content):
+        path = self.directory / name
+        path.write_text(content, encoding='utf-8')
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            'import_ingredients', file_path=str(path), batch_size=2,
+            stdout=stdout, stderr=stderr,
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_csv(self):
+        content = (
+            'соль,г\n'
+            'сахар,г\n'
+            'сахар,г\n'
+            'мука,г,лишнее\n'
+            'молоко\n'
+            ' молоко , мл \n'
+        )
+        stdout, stderr = self.run_import('ingredients.csv', content)
+        self.assertIn(
+            'Прочитано: 4, добавлено: 2, обновлено: 0, пропущено: 2, '
+            'некорректных строк: 2', stdout
+        )
+        self.assertIn('строка 4', stderr)
+        self.assertIn('строка 5', stderr)
+        self.assertEqual(
+            set(Ingredient.objects.values_list('name', 'measurement_unit')),
+            {('соль', 'г'), ('сахар', 'г'), ('молоко', 'мл')},
+        )
+        stdout, _ = self.run_import('ingredients.csv', content)
+        self.assertIn('добавлено: 0, обновлено: 0, пропущено: 4', stdout)
+
+    def test_json(self):
+        stdout, stderr = self.run_import('ingredients.json', json.dumps([
+            {'name': 'соль', 'measurement_unit': 'г'},
+            {'name': 'перец', 'measurement_unit': 'г'},
+            {'name': 'вода'},
+        ]))
+        self.assertIn(
+            'Прочитано: 2, добавлено: 1, обновлено: 0, пропущено: 1, '
+            'некорректных строк: 1', stdout
+        )
+        self.assertIn('элемент 3', stderr)
@@ -0,0 +1,69 @@
+import asyncio
+
+from django.test import AsyncClient, SimpleTestCase, TestCase
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Subscription, User
+
+
+def queries(response):
+    timings = dict(
+        part.split(';', 1) for part in response['Server-Timing'].split(', ')
+    )
+    return int(timings['db-queries'].split('"')[1])
+
+
+class RequestMetricsTest(TestCase):
+    """
+    SQL учитывается в метриках только того запроса, который его выполнил.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='reader', email='r@r.ru')
+        author = User.objects.create(username='author', email='a@a.ru')
+        Subscription.objects.create(author=author, subscriber=user)
+        cls.token = Token.objects.create(user=user).key
+
+    async def test_concurrent_requests(self):
+        client = AsyncClient()
+        url = '/api/users/subscriptions/'
+        headers = {'authorization': f'Token {self.token}'}
+        expected = queries(await client.get(url, **headers))
+        responses = await asyncio.gather(
+            *(client.get(url, **headers) for _ in range(8))
+        )
+        self.assertEqual(
+            [queries(response) for response in responses], [expected] * 8
+        )
+
+
+@override_settings(
+    METRICS_ENABLED=True, METRICS_ALLOWED_IPS=['10.0.0.0/8'],
+    METRICS_TOKEN='secret',
+)
+class MetricsAccessTest(SimpleTestCase):
+    """
+    /metrics отдается только адресам из списка и по токену.
+    """
+
+    def get(self, **extra):
+        return self.client.get('/metrics', **extra).status_code
+
+    def test_allowed_addresses(self):
+        self.assertEqual(self.get(REMOTE_ADDR='10.1.2.3'), 200)
+        self.assertEqual(self.get(REMOTE_ADDR='192.168.1.1'), 404)
+
+    def test_token(self):
+        address = {'REMOTE_ADDR': '192.168.1.1'}
+        self.assertEqual(
+            self.get(HTTP_AUTHORIZATION='Bearer secret', **address), 200
+        )
+        self.assertEqual(
+            self.get(HTTP_AUTHORIZATION='Bearer wrong', **address), 404
+        )
+
+    def test_disabled(self):
+        with override_settings(METRICS_ENABLED=False):
+            self.assertEqual(self.get(REMOTE_ADDR='10.1.2.3'), 404)
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, User
+
+
+class RecipeCursorPaginationTest(TestCase):
+    """
+    Курсор по ключу (publish_date, id) проходит рецепты с одинаковой
+    датой публикации без пропусков и повторов в обе стороны.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='author', email='a@a.ru')
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=author, name=f'Рецепт {number}', text='Текст',
+                cooking_time=10, image='images/recipe.png',
+            )
+            for number in range(7)
+        )
+        now = timezone.now()
+        pks = list(Recipe.objects.order_by('pk').values_list('pk', flat=True))
+        Recipe.objects.filter(pk__in=pks[:2]).update(
+            publish_date=now - timedelta(days=1)
+        )
+        Recipe.objects.filter(pk__in=pks[2:]).update(publish_date=now)
+        cls.expected = list(Recipe.objects.order_by(
+            '-publish_date', '-id'
+        ).values_list('pk', flat=True))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get())
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_forward_and_backward(self):
+        pages = []
+        data = self.get('/api/recipes/?pagination=cursor&limit=2')
+        self.assertIsNone(data['previous'])
+        while True:
+            pages.append([recipe['id'] for recipe in data['results']])
+            if data['next'] is None:
+                break
+            data = self.get(data['next'])
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        for page in reversed(pages[:-1]):
+            data = self.get(data['previous'])
+            self.assertEqual(
+                [recipe['id'] for recipe in data['results']], page
+            )
+        self.assertIsNone(data['previous'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/recipes/?pagination=cursor&cursor=x')
+        self.assertEqual(response.status_code, 404)
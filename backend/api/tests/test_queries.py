@@ -0,0 +1,61 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, \
+    Subscription, Tag, User
+
+
+class QueryCountTest(TestCase):
+    """
+    Число SQL-запросов страницы не зависит от числа объектов на ней.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='reader', email='r@r.ru')
+        tags = [
+            Tag.objects.create(name=f'Тег {i}', color='#000000', slug=f't{i}')
+            for i in range(2)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Продукт {i}', measurement_unit='г'
+            )
+            for i in range(3)
+        ]
+        for number in range(6):
+            author = User.objects.create(
+                username=f'author{number}', email=f'a{number}@a.ru'
+            )
+            Subscription.objects.create(author=author, subscriber=cls.user)
+            for _ in range(3):
+                recipe = Recipe.objects.create(
+                    author=author, name='Рецепт', text='Текст',
+                    cooking_time=10, image='images/recipe.png',
+                )
+                recipe.tags.set(tags)
+                RecipeIngredient.objects.bulk_create(
+                    RecipeIngredient(
+                        recipe=recipe, ingredient=ingredient, amount=1
+                    )
+                    for ingredient in ingredients
+                )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_recipes_list(self):
+        for limit in (1, 6):
+            with self.subTest(limit=limit), self.assertNumQueries(6):
+                response = self.client.get(f'/api/recipes/?limit={limit}')
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_subscriptions(self):
+        for limit in (1, 6):
+            with self.subTest(limit=limit), self.assertNumQueries(4):
+                response = self.client.get(
+                    f'/api/users/subscriptions/?limit={limit}'
+                    '&recipes_limit=2'
+                )
+                self.assertEqual(len(response.data['results']), limit)
@@ -0,0 +1,113 @@
+import re
+import shutil
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, Tag, User
+
+# Серверный курсор (.iterator()) приходит в журнал запросов
+# как DECLARE ... CURSOR ... FOR SELECT.
+DECLARE_CURSOR = re.compile(r'DECLARE\s.*?\sCURSOR\s.*?FOR\s+', re.S | re.I)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN для PostgreSQL.')
+@override_settings(ESTIMATED_COUNT=True, INGREDIENTS_IN_MEMORY_INDEX=False)
+class QueryPlanTest(TestCase):
+    """
+    SQL горячих эндпоинтов на заполненной БД не читает таблицы целиком.
+    Планы строятся с enable_seqscan = off: на тестовом объеме данных
+    Seq Scan дешевле индекса, а так он остается в плане, только если
+    подходящего индекса нет.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media.disable()
+        shutil.rmtree(cls.media_root)
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_benchmark_data', users=200, recipes=2000, stdout=StringIO()
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.user = User.objects.filter(
+            favorites__isnull=False,
+            cart_ingredients__isnull=False,
+            writers__isnull=False,
+        ).first()
+        cls.recipe = Recipe.objects.first()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def endpoints(self):
+        tags = '&'.join(
+            f'tags={slug}'
+            for slug in Tag.objects.values_list('slug', flat=True)[:3]
+        )
+        yield '/api/recipes/'
+        yield f'/api/recipes/?{tags}'
+        yield f'/api/recipes/?author={self.recipe.author_id}'
+        yield self.client.get('/api/recipes/?pagination=cursor').data['next']
+        yield '/api/recipes/?is_favorited=1'
+        yield '/api/recipes/?is_in_shopping_cart=1'
+        yield f'/api/recipes/{self.recipe.pk}/'
+        yield '/api/users/subscriptions/?recipes_limit=3'
+        yield '/api/ingredients/?name=соль'
+        yield '/api/recipes/download_shopping_cart/'
+
+    def capture(self, url):
+        """
+        SELECT всех запросов эндпоинта, включая prefetch и потоковую
+        выдачу, без повторов.
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+        self.assertEqual(response.status_code, 200)
+        return list(dict.fromkeys(
+            statement for statement in (
+                DECLARE_CURSOR.sub('', query['sql'], count=1).lstrip()
+                for query in context.captured_queries
+            )
+            if statement.upper().startswith('SELECT')
+        ))
+
+    def seq_scans(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+            plans = [cursor.fetchone()[0][0]['Plan']]
+        while plans:
+            plan = plans.pop()
+            if plan['Node Type'] == 'Seq Scan':
+                yield plan['Relation Name']
+            plans.extend(plan.get('Plans', []))
+
+    def test_no_seq_scans(self):
+        for url in self.endpoints():
+            with self.subTest(url=url):
+                statements = self.capture(url)
+                self.assertTrue(statements)
+                for sql in statements:
+                    self.assertEqual(list(self.seq_scans(sql)), [], sql)
@@ -0,0 +1,131 @@
+from unittest import mock
+
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.checks import Error
+from django.db import connections
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.checks import replica_cache_check
+from foodgram.db.router import ReplicaRouter, read_database, use_replica
+from recipes.models import Recipe, User
+
+db_for_read = ReplicaRouter.db_for_read
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTest(TestCase):
+    """
+    Какие запросы читают с реплики. Алиас replica в тестах - то же
+    соединение, что default, маршрут записывается роутером.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='reader', email='r@r.ru')
+        cls.user.set_password('Pass12345!')
+        cls.user.save()
+        cls.token = Token.objects.create(user=cls.user)
+        cls.recipe = Recipe.objects.create(
+            author=cls.user, name='Рецепт', text='Текст',
+            cooking_time=10, image='images/recipe.png',
+        )
+
+    def setUp(self):
+        connections['replica'] = connections['default']
+        self.addCleanup(connections.__delitem__, 'replica')
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.reads = []
+
+        def record(router, model, **hints):
+            alias = db_for_read(router, model, **hints)
+            self.reads.append((model._meta.label_lower, alias))
+            return alias
+
+        patcher = mock.patch.object(ReplicaRouter, 'db_for_read', record)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def get(self, url):
+        self.reads.clear()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return dict(self.reads)
+
+    def test_safe_reads_use_replica(self):
+        reads = self.get('/api/recipes/')
+        self.assertEqual(reads['recipes.recipe'], 'replica')
+        self.assertEqual(reads['authtoken.token'], 'default')
+
+    def test_write_pins_reads_to_primary(self):
+        response = self.client.post(
+            f'/api/recipes/{self.recipe.pk}/favorite/'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            set(self.get('/api/recipes/').values()), {'default'}
+        )
+        cache.clear()
+        self.assertEqual(
+            self.get('/api/recipes/')['recipes.recipe'], 'replica'
+        )
+
+    def test_reads_after_login_use_primary(self):
+        client = APIClient()
+        response = client.post('/api/auth/token/login/', {
+            'email': self.user.email, 'password': 'Pass12345!',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {response.data["auth_token"]}'
+        )
+        self.assertEqual(
+            set(self.get('/api/users/me/').values()), {'default'}
+        )
+
+    def test_tokens_and_sessions_use_primary(self):
+        token = use_replica()
+        self.addCleanup(read_database.reset, token)
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Recipe), 'replica')
+        self.assertEqual(router.db_for_read(Token), 'default')
+        self.assertEqual(router.db_for_read(Session), 'default')
+
+
+class ReplicaCacheCheckTest(SimpleTestCase):
+    """
+    Реплики без общего кэша не включаются.
+    """
+
+    def caches(self, backend):
+        return {'default': {
+            'BACKEND': f'django.core.cache.backends.{backend}',
+            'LOCATION': 'cache',
+        }}
+
+    def test_local_cache(self):
+        with override_settings(
+            DATABASE_REPLICAS=['replica'],
+            CACHES=self.caches('locmem.LocMemCache'),
+        ):
+            errors = replica_cache_check(None)
+        self.assertEqual([error.id for error in errors], ['api.E001'])
+        self.assertIsInstance(errors[0], Error)
+
+    def test_shared_cache(self):
+        with override_settings(
+            DATABASE_REPLICAS=['replica'],
+            CACHES=self.caches('db.DatabaseCache'),
+        ):
+            self.assertEqual(replica_cache_check(None), [])
+        with override_settings(
+            DATABASE_REPLICAS=[],
+            CACHES=self.caches('locmem.LocMemCache'),
+        ):
+            self.assertEqual(replica_cache_check(None), [])
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from recipes.models import Recipe, User
+from recipes.storage import delete_unreferenced_files
+
+
+class UnreferencedFilesTest(TestCase):
+    """
+    Очистка не удаляет файл, который только что загрузили повторно:
+    ссылающийся на него рецепт может быть еще не зафиксирован.
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def save(self, content):
+        return default_storage.save('images/recipe.png', ContentFile(content))
+
+    def age(self, name, seconds=3600):
+        moment = time.time() - seconds
+        os.utime(default_storage.path(name), (moment, moment))
+
+    def test_reused_file_is_kept(self):
+        name = self.save(b'image')
+        self.age(name)
+        self.assertEqual(self.save(b'image'), name)
+        delete_unreferenced_files([name])
+        self.assertTrue(default_storage.exists(name))
+        delete_unreferenced_files([name], grace=0)
+        self.assertFalse(default_storage.exists(name))
+
+    def test_old_file_is_deleted(self):
+        name = self.save(b'image')
+        self.age(name)
+        delete_unreferenced_files([name])
+        self.assertFalse(default_storage.exists(name))
+        self.assertEqual(self.save(b'image'), name)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_orphans_command(self):
+        referenced, orphan, fresh = (
+            self.save(content) for content in (b'a', b'b', b'c')
+        )
+        self.age(referenced)
+        self.age(orphan)
+        Recipe.objects.create(
+            author=User.objects.create(username='author', email='a@a.ru'),
+            name='Рецепт', text='Текст', cooking_time=10, image=referenced,
+        )
+        stdout = StringIO()
+        call_command('delete_orphan_images', stdout=stdout)
+        self.assertIn(
+            'Файлов: 3, без ссылок: 2, удалено: 1', stdout.getvalue()
+        )
+        self.assertTrue(default_storage.exists(referenced))
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(fresh))
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework import routers
 
+from api.async_views import async_read_urls
 from api.views import TagsViewSet, RecipesViewSet, \
     IngredientsViewSet, CustomUserViewSet
 
@@ -11,8 +13,12 @@ router.register('tags', TagsViewSet, basename='tags')
 router.register('recipes', RecipesViewSet, basename='recipes')
 router.register('ingredients', IngredientsViewSet, basename='ingredients')
 
+router_urls = router.urls
+if settings.ASYNC_READ_VIEWS:
+    router_urls = async_read_urls(router_urls)
+
 
 urlpatterns = [
     path('auth/', include('djoser.urls.authtoken')),
-    path('', include(router.urls)),
+    path('', include(router_urls)),
 ]
@@ -4,21 +4,40 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters
-from django.db.models import Sum
-from django.db import IntegrityError
+from django.db.models import Exists, OuterRef, Prefetch, Subquery
+from django.db import IntegrityError, transaction
+from django.conf import settings
+from django.utils.decorators import method_decorator
 from rest_framework.permissions import AllowAny, IsAuthenticated
 
 from recipes.models import Tag, Recipe, Ingredient, User, Subscription, \
-    FavoriteRecipe, ShoppingCart
+    FavoriteRecipe, ShoppingCart, ShoppingCartIngredient
 from .serializers import TagSerializer, RecipeSerializer, \
     IngredientSerializer, SubscriptionSerializer, UserSerializer, \
     SetPasswordSerializer, FavoriteRecipeSerializer, \
     ShopingCartSerializer, RecipeCreateSerializer, UserCreateSerializer
 from .filters import RecipeFilter, IngredientFilter
-from recipes.utils import queryset_to_csv
+from recipes.utils import shopping_list_response
 from .permissions import IsOwnerOrAdminOrReadOnly, ReadOnly
-from .pagination import CustomPagination
+from .caching import conditional, catalogue_versions, recipe_versions, \
+    cached_for_anonymous, anonymous_recipe_versions
+from .pagination import CustomPagination, RecipePagination
+from .search import ingredient_index
+from .renderers import ShoppingListCSVRenderer, ShoppingListTextRenderer, \
+    ShoppingListPDFRenderer
+
+
+def annotate_is_subscribed(queryset, user):
+    """
+    Аннотирует пользователей статусом подписки на них текущего пользователя.
+    """
+    return queryset.annotate(
+        is_subscribed=Exists(
+            Subscription.objects.filter(
+                author=OuterRef('pk'), subscriber=user
+            )
+        )
+    )
 
 
 class CustomUserViewSet(UserViewSet):
@@ -26,6 +45,12 @@ class CustomUserViewSet(UserViewSet):
     serializer_class = UserSerializer
     pagination_class = CustomPagination
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.user.is_authenticated:
+            queryset = annotate_is_subscribed(queryset, self.request.user)
+        return queryset
+
     @action(
         detail=False,
         methods=['get'],
@@ -37,7 +62,7 @@ class CustomUserViewSet(UserViewSet):
         на которых подписан пользователь их рецепты.
         """
         limit_recipes = int(request.GET.get('recipes_limit', 0))
-        writers = self.request.user.writers.all()
+        writers = self.get_subscriptions_queryset(limit_recipes)
 
         page = self.paginate_queryset(writers)
         if page is not None:
@@ -46,26 +71,36 @@ class CustomUserViewSet(UserViewSet):
                 many=True,
                 context={'request': request}
             )
-            paginated_data = self.get_paginated_response(serializer.data).data
-
-            return self.limit_recipes(paginated_data, limit_recipes)
+            return self.get_paginated_response(serializer.data)
 
         serializer = SubscriptionSerializer(
             writers,
             many=True,
             context={'request': request}
         )
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
-        return self.limit_recipes(serializer.data, limit_recipes)
-
-    def limit_recipes(self, data, limit):
+    def get_subscriptions_queryset(self, limit):
         """
-        Ограничение количесва рецептов в выводе.
+        Подписки пользователя с авторами и их последними рецептами.
+        Количество рецептов ограничивается в БД коррелированным подзапросом
+        с LIMIT, число рецептов автора берется из счетчика UserStats.
         """
-        for result in data['results']:
-            result['recipes'] = result['recipes'][:limit]
-
-        return Response(data, status=status.HTTP_200_OK)
+        latest_recipes = Recipe.objects.filter(
+            pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).values('pk')[:limit]
+            )
+        ) if limit > 0 else Recipe.objects.none()
+        authors = annotate_is_subscribed(
+            User.objects.select_related('stats'),
+            self.request.user
+        )
+        return self.request.user.writers.prefetch_related(
+            Prefetch('author', queryset=authors),
+            Prefetch('author__recipes', queryset=latest_recipes),
+        ).order_by('id')
 
     @action(
         detail=True,
@@ -119,17 +154,45 @@ class CustomUserViewSet(UserViewSet):
             return super().perform_create(serializer, *args, **kwargs)
 
 
+@method_decorator(
+    conditional(catalogue_versions('ingredients')), name='list'
+)
+@method_decorator(
+    conditional(catalogue_versions('ingredients')), name='retrieve'
+)
 class IngredientsViewSet(ModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    filterset_fields = ('name', )
-    search_fields = ('name',)
+    filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientFilter
     permission_classes = (IsOwnerOrAdminOrReadOnly,)
 
+    def filter_queryset(self, queryset):
+        """
+        Поиск по названию для автодополнения ограничен по количеству.
+        """
+        queryset = super().filter_queryset(queryset)
+        if self.action == 'list' and self.request.query_params.get('name'):
+            return queryset[:settings.INGREDIENTS_SEARCH_LIMIT]
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """
+        Автодополнение по названию обслуживается индексом в памяти.
+        """
+        name = request.query_params.get('name')
+        if name and settings.INGREDIENTS_IN_MEMORY_INDEX:
+            return Response(
+                ingredient_index.search(
+                    name, settings.INGREDIENTS_SEARCH_LIMIT
+                )
+            )
+        return super().list(request, *args, **kwargs)
+
 
+@method_decorator(conditional(catalogue_versions('tags')), name='list')
+@method_decorator(conditional(catalogue_versions('tags')), name='retrieve')
 class TagsViewSet(ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
@@ -137,18 +200,51 @@ class TagsViewSet(ModelViewSet):
     permission_classes = (AllowAny,)
 
 
+@method_decorator(
+    conditional(recipe_versions, private=True), name='retrieve'
+)
+@method_decorator(
+    cached_for_anonymous(anonymous_recipe_versions), name='retrieve'
+)
+@method_decorator(
+    cached_for_anonymous(anonymous_recipe_versions), name='list'
+)
 class RecipesViewSet(ModelViewSet):
     serializer_class = RecipeSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
     permission_classes = (IsOwnerOrAdminOrReadOnly,)
-    pagination_class = CustomPagination
+    pagination_class = RecipePagination
 
     def get_queryset(self):
+        """
+        Статусы избранного, корзины и подписки на автора считаются
+        подзапросами EXISTS, чтобы страница не порождала запросы на каждый
+        рецепт.
+        """
         recipes = Recipe.objects.prefetch_related(
             'recipe_ingredients__ingredient', 'tags'
-        ).all()
-        return recipes
+        )
+        user = self.request.user
+        if user.is_anonymous:
+            return recipes.select_related('author')
+        return recipes.prefetch_related(
+            Prefetch(
+                'author',
+                queryset=annotate_is_subscribed(User.objects.all(), user)
+            )
+        ).annotate(
+            favorited=Exists(
+                FavoriteRecipe.objects.filter(
+                    recipe=OuterRef('pk'), user=user
+                )
+            ),
+            in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(
+                    recipe=OuterRef('pk'), user=user
+                )
+            ),
+        )
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -176,7 +272,11 @@ class RecipesViewSet(ModelViewSet):
         methods=['post', 'delete'],
         permission_classes=(IsAuthenticated,),
     )
+    @transaction.atomic
     def shopping_cart(self, request, pk=None):
+        """
+        Добавление/удаление рецепта в корзине вместе с итогами корзины.
+        """
         recipe = self.get_object()
 
         if request.method == 'POST':
@@ -185,7 +285,9 @@ class RecipesViewSet(ModelViewSet):
             )
 
         if request.method == 'DELETE':
-            return self.delete_related_entry(request, recipe, ShoppingCart)
+            return self.delete_related_entry(
+                request, recipe, ShoppingCart
+            )
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -198,19 +300,25 @@ class RecipesViewSet(ModelViewSet):
     @action(
         detail=False,
         methods=['get', ],
-        permission_classes=(IsAuthenticated,)
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(
+            ShoppingListCSVRenderer,
+            ShoppingListTextRenderer,
+            ShoppingListPDFRenderer,
+        ),
     )
     def download_shopping_cart(self, request):
-        user = self.request.user
-        shoping_list = Ingredient.objects.filter(
-            recipe__in_users_cart__user=user
-        ).annotate(
-            total_amount=Sum('recipeingredient__amount')
-        ).order_by('name')
-        ingredients_list = list(shoping_list.values_list(
-            'name', 'total_amount', 'measurement_unit'
-        ))
-        return queryset_to_csv(ingredients_list)
+        """
+        Потоковая выгрузка списка покупок в csv, txt или pdf (?format=).
+        """
+        ingredients = ShoppingCartIngredient.objects.filter(
+            user=self.request.user
+        ).order_by('ingredient__name').values_list(
+            'ingredient__name', 'amount', 'ingredient__measurement_unit'
+        ).iterator(chunk_size=settings.SHOPPING_LIST_CHUNK_SIZE)
+        return shopping_list_response(
+            ingredients, request.accepted_renderer.format
+        )
 
     def get_permissions(self):
         if self.action == 'retrieve':
@@ -9,6 +9,9 @@ echo "PostgreSQL started"
 
 python manage.py collectstatic --no-input \
 && python manage.py migrate \
-&& gunicorn --bind 0.0.0.0:8000 foodgram.wsgi
+&& gunicorn --bind 0.0.0.0:8000 \
+    --workers ${GUNICORN_WORKERS:-1} --threads ${GUNICORN_THREADS:-1} \
+    --worker-class ${GUNICORN_WORKER_CLASS:-sync} \
+    ${GUNICORN_APP:-foodgram.wsgi}
 
 exec "$@"
\ No newline at end of file
@@ -9,8 +9,55 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
 
-application = get_asgi_application()
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    В Django 3.2 тело потокового ответа читается прямо в цикле событий,
+    и ленивые запросы к БД в нем, как у выгрузки списка покупок,
+    падают с SynchronousOnlyOperation. Здесь тело читается по частям
+    в синхронном потоке, где выполнялось представление.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        headers = [
+            (
+                header.encode('ascii') if isinstance(header, str) else header,
+                value.encode('latin1') if isinstance(value, str) else value,
+            )
+            for header, value in response.items()
+        ] + [
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        ]
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        parts = iter(response)
+        read = sync_to_async(next, thread_sensitive=True)
+        while True:
+            part = await read(parts, None)
+            if part is None:
+                break
+            for chunk, _ in self.chunk_bytes(part):
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+
+django.setup(set_prefix=False)
+application = StreamingASGIHandler()
@@ -0,0 +1,97 @@
+from django.db.backends.postgresql import base, creation
+
+from .pool import close_pools, get_pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Свободные соединения пула держат тестовую БД открытой.
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL с проверкой постоянных соединений и пулом соединений.
+
+    CONN_HEALTH_CHECKS: перед первым запросом в рамках HTTP-запроса
+    переиспользуемое соединение проверяется и при обрыве открывается
+    заново. POOL_SIZE > 0: физические соединения не закрываются,
+    а возвращаются в общий для потоков процесса пул. Пул выбирается
+    по псевдониму и имени БД: тесты меняют имя БД у того же псевдонима.
+    """
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        self.pool = None
+
+    def get_new_connection(self, conn_params):
+        size = self.settings_dict.get('POOL_SIZE', 0)
+        self.pool = get_pool(
+            self.alias, self.settings_dict['NAME'], size,
+            self.settings_dict.get('POOL_TIMEOUT', 10),
+        ) if size else None
+        if self.pool is None:
+            return super().get_new_connection(conn_params)
+        while True:
+            connection, reused = self.pool.acquire(
+                lambda: super(DatabaseWrapper, self).get_new_connection(
+                    conn_params
+                )
+            )
+            if not reused or self.is_healthy(connection):
+                break
+            self.pool.release(connection, discard=True)
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+        return connection
+
+    def is_healthy(self, connection):
+        """
+        Проверка соединения из пула перед выдачей.
+        """
+        if connection.closed:
+            return False
+        if not self.settings_dict.get('CONN_HEALTH_CHECKS'):
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.rollback()
+        except base.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        if self.pool is None or self.connection is None:
+            return super()._close()
+        # Соединение, закрытое внутри atomic, остается у обертки до
+        # отката, поэтому в пул оно не возвращается.
+        self.pool.release(self.connection, discard=self.in_atomic_block)
+
+    def connect(self):
+        # Новое соединение проверять не нужно. Флаг ставится до
+        # подключения: connect() включает autocommit через
+        # ensure_connection(), и проверка там открыла бы транзакцию.
+        self.health_check_done = True
+        super().connect()
+
+    def ensure_connection(self):
+        if (
+            self.connection is not None
+            and self.settings_dict.get('CONN_HEALTH_CHECKS')
+            and not self.health_check_done
+            and not self.in_atomic_block
+        ):
+            if not self.is_usable():
+                self.close()
+            self.health_check_done = True
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
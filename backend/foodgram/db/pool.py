@@ -0,0 +1,135 @@
+import time
+from threading import Condition, Lock
+
+from django.db import OperationalError
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Пул соединений процесса: не больше size открытых соединений,
+    остальные потоки ждут освобождения до timeout секунд.
+    """
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.idle = []
+        self.condition = Condition()
+        self.in_use = 0
+        self.waiting = 0
+        self.created = 0
+        self.discarded = 0
+        self.timeouts = 0
+
+    def acquire(self, connect):
+        """
+        Соединение из пула и признак того, что оно уже использовалось.
+        """
+        with self.condition:
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.timeout
+                while not self.idle and self.in_use >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(
+                            f'Нет свободных соединений за {self.timeout} с.'
+                        )
+                    self.condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.in_use += 1
+            if self.idle:
+                return self.idle.pop(), True
+        try:
+            connection = connect()
+        except Exception:
+            with self.condition:
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.created += 1
+        return connection, False
+
+    def release(self, connection, discard=False):
+        """
+        Возвращает соединение в пул. reset() откатывает открытую
+        транзакцию и сбрасывает параметры сессии, autocommit
+        при выдаче включает Django. Сломанные соединения и те,
+        что не удалось сбросить, закрываются.
+        """
+        if not discard and not connection.closed:
+            try:
+                connection.reset()
+            except Exception:
+                discard = True
+        if discard or connection.closed:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        with self.condition:
+            self.in_use -= 1
+            if discard or connection.closed:
+                self.discarded += 1
+            else:
+                self.idle.append(connection)
+            self.condition.notify()
+
+    def close(self):
+        """
+        Закрывает свободные соединения пула.
+        """
+        with self.condition:
+            idle, self.idle = self.idle, []
+        for connection in idle:
+            connection.close()
+
+    def stats(self):
+        with self.condition:
+            return {
+                'size': self.size,
+                'in_use': self.in_use,
+                'idle': len(self.idle),
+                'waiting': self.waiting,
+                'created': self.created,
+                'discarded': self.discarded,
+                'timeouts': self.timeouts,
+            }
+
+
+pools = {}
+pools_lock = Lock()
+
+
+def get_pool(alias, database, size, timeout):
+    with pools_lock:
+        if (alias, database) not in pools:
+            pools[alias, database] = ConnectionPool(size, timeout)
+        return pools[alias, database]
+
+
+def close_pools(database):
+    """
+    Закрывает свободные соединения всех пулов БД database.
+    """
+    with pools_lock:
+        matching = [
+            pool for (_, name), pool in pools.items() if name == database
+        ]
+    for pool in matching:
+        pool.close()
+
+
+def pool_stats():
+    """
+    Состояние пулов соединений по псевдонимам и именам БД.
+    """
+    with pools_lock:
+        return {key: pool.stats() for key, pool in pools.items()}
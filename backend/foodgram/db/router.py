@@ -0,0 +1,64 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import time
+
+from django.conf import settings
+
+
+# Реплика для чтения выбирается только на время безопасного HTTP-запроса,
+# поэтому команды, фоновые потоки и запросы с записью читают с основной БД.
+read_database = ContextVar('read_database', default=None)
+
+
+def use_replica():
+    """
+    Направляет чтение до конца запроса на одну случайную реплику,
+    чтобы все запросы одного ответа видели одно состояние данных.
+    """
+    if settings.DATABASE_REPLICAS:
+        return read_database.set(random.choice(settings.DATABASE_REPLICAS))
+    return read_database.set(None)
+
+
+@contextmanager
+def read_primary_after(changed_at):
+    """
+    Чтение с основной БД, если данные менялись (changed_at - время
+    из версии) не раньше DATABASE_REPLICA_STICKY_SECONDS назад.
+    Нужно там, где результат кэшируется под новой версией: реплика
+    могла еще не получить изменение.
+    """
+    if time() - changed_at >= settings.DATABASE_REPLICA_STICKY_SECONDS:
+        yield
+        return
+    token = read_database.set(None)
+    try:
+        yield
+    finally:
+        read_database.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Чтение - с выбранной для запроса реплики, запись и миграции -
+    на основную БД. После первой записи чтение тоже идет с основной БД.
+    Токены и сессии всегда читаются с основной БД: только что выданные
+    могли еще не попасть на реплику.
+    """
+    primary_models = {'authtoken.token', 'sessions.session'}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in self.primary_models:
+            return 'default'
+        return read_database.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        read_database.set(None)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -1,59 +1,123 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
 
 from .models import Tag, Recipe, Ingredient, RecipeIngredient, \
-    Subscription, ShoppingCart, FavoriteRecipe
+    Subscription, ShoppingCart, FavoriteRecipe, UserStats, count_of
+from .queries import estimate_count
+
+
+class EstimatedCountAdminPaginator(Paginator):
+    """
+    Пагинатор списков админки: на больших таблицах PostgreSQL число
+    строк берется из плана запроса вместо COUNT(*).
+    """
+
+    @cached_property
+    def count(self):
+        if settings.ADMIN_ESTIMATED_COUNT:
+            return estimate_count(self.object_list)
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Базовая админка для больших таблиц: без полного COUNT(*) на каждой
+    странице списка.
+    """
+    paginator = EstimatedCountAdminPaginator
+    show_full_result_count = False
 
 
 class RecipeIngredientInLine(admin.TabularInline):
     model = RecipeIngredient
     extra = 1
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient')
 
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = ('name', 'color', 'slug')
+    search_fields = ('name', 'slug')
 
 
 @admin.register(Recipe)
-class RecipesAdmin(admin.ModelAdmin):
+class RecipesAdmin(LargeTableAdmin):
     inlines = (RecipeIngredientInLine, )
-    list_display = ('name', 'author')
-    list_filter = ('author', 'tags', 'name')
-    search_fields = ('name',)
+    list_display = (
+        'name', 'author', 'tags_list', 'ingredients_count',
+        'favorites_count', 'in_carts_count'
+    )
+    list_filter = ('tags',)
+    list_select_related = ('author',)
+    search_fields = ('name', '=author__username')
+    autocomplete_fields = ('author', 'tags')
     fields = (
         'name', 'author', 'tags', 'text', 'cooking_time', 'image',
-        'count_favorites'
+        'favorites_count', 'in_carts_count'
     )
-    readonly_fields = ('count_favorites',)
+    readonly_fields = ('favorites_count', 'in_carts_count')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            'tags'
+        ).annotate(
+            ingredients_count=count_of(RecipeIngredient, 'recipe')
+        )
 
-    def count_favorites(self, instance):
-        count = FavoriteRecipe.objects.filter(
-            recipe=instance
-        ).count()
-        return count
+    @admin.display(description='Теги')
+    def tags_list(self, instance):
+        return ', '.join(tag.name for tag in instance.tags.all())
+
+    @admin.display(description='Ингредиентов')
+    def ingredients_count(self, instance):
+        return instance.ingredients_count
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(LargeTableAdmin):
     list_display = ('name', 'measurement_unit')
     search_fields = ('name',)
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(LargeTableAdmin):
     list_display = ('author', 'subscriber')
+    list_select_related = ('author', 'subscriber')
+    search_fields = ('=author__username', '=subscriber__username')
+    autocomplete_fields = ('author', 'subscriber')
 
 
 @admin.register(RecipeIngredient)
-class RecipeIngredientAdmin(admin.ModelAdmin):
+class RecipeIngredientAdmin(LargeTableAdmin):
     list_display = ('recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(LargeTableAdmin):
     list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('=user__username',)
+    autocomplete_fields = ('user', 'recipe')
 
 
 @admin.register(FavoriteRecipe)
-class FavoriteRecipeAdmin(admin.ModelAdmin):
+class FavoriteRecipeAdmin(LargeTableAdmin):
     list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('=user__username',)
+    autocomplete_fields = ('user', 'recipe')
+
+
+@admin.register(UserStats)
+class UserStatsAdmin(LargeTableAdmin):
+    list_display = ('user', 'recipes_count', 'subscribers_count')
+    list_select_related = ('user',)
+    search_fields = ('=user__username',)
+    readonly_fields = ('user', 'recipes_count', 'subscribers_count')
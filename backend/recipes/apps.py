@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
+        from .utils import register_pdf_font
+        register_pdf_font()
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from .utils import register_pdf_font
+
+
+@register()
+def pdf_font_check(app_configs, **kwargs):
+    """
+    Шрифт для pdf со списком покупок должен загружаться.
+    """
+    if settings.PDF_FONT_PATH and not register_pdf_font():
+        return [Warning(
+            f'Не удалось загрузить шрифт PDF_FONT_PATH: '
+            f'{settings.PDF_FONT_PATH}.',
+            hint=(
+                'Список покупок в pdf будет выведен шрифтом Helvetica '
+                'без кириллицы. Укажите путь к TTF-шрифту или пустое '
+                'значение.'
+            ),
+            id='recipes.W001',
+        )]
+    return []
@@ -0,0 +1,156 @@
+import io
+import logging
+from base64 import b64decode
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .models import Recipe
+from .storage import delete_unreferenced_files
+from .versions import bump_version
+
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_RENDITIONS_WORKERS,
+    thread_name_prefix='image-renditions',
+)
+
+
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png', 'image/png'),
+    (b'\xff\xd8\xff', 'jpg', 'image/jpeg'),
+    (b'GIF87a', 'gif', 'image/gif'),
+    (b'GIF89a', 'gif', 'image/gif'),
+)
+
+
+def sniff_image_type(head):
+    """
+    Тип изображения по сигнатуре в начале файла: (расширение, MIME-тип)
+    или None, если формат не поддерживается.
+    """
+    for signature, extension, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension, content_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp', 'image/webp'
+    return None
+
+
+def base64_decoded_size(data, start=0):
+    """
+    Размер данных после декодирования base64 без самого декодирования.
+    """
+    length = len(data) - start
+    padding = data[-2:].count('=') if length else 0
+    return length * 3 // 4 - padding
+
+
+def decode_base64_image(data, start=0):
+    """
+    Декодирует base64 из строки data, начиная с позиции start, кусками
+    во временный файл. Тип изображения определяется по сигнатуре,
+    а не по префиксу data URL. ValueError (в том числе binascii.Error) -
+    если данные не base64 или не изображение поддерживаемого формата.
+    """
+    chunk_size = settings.BASE64_DECODE_CHUNK_SIZE // 4 * 4
+    upload = TemporaryUploadedFile(
+        'image', 'application/octet-stream',
+        base64_decoded_size(data, start), None
+    )
+    try:
+        for position in range(start, len(data), chunk_size):
+            chunk = b64decode(data[position:position + chunk_size])
+            if position == start:
+                image_type = sniff_image_type(chunk)
+                if image_type is None:
+                    raise ValueError('Неподдерживаемый формат изображения.')
+                extension, upload.content_type = image_type
+                upload.name = f'temp.{extension}'
+            upload.write(chunk)
+    except ValueError:
+        upload.close()
+        raise
+    upload.size = upload.tell()
+    upload.seek(0)
+    return upload
+
+
+def render(image, size):
+    """
+    Уменьшенная копия изображения, вписанная в квадрат size x size.
+    """
+    rendition = image.copy()
+    rendition.thumbnail((size, size), Image.LANCZOS)
+    buffer = io.BytesIO()
+    rendition.save(
+        buffer,
+        format=settings.IMAGE_RENDITIONS_FORMAT,
+        quality=settings.IMAGE_RENDITIONS_QUALITY,
+    )
+    return buffer.getvalue()
+
+
+def build_renditions(recipe_id):
+    """
+    Строит уменьшенные копии изображения рецепта. Исходник
+    декодируется один раз, копии сохраняются, только если изображение
+    рецепта не заменили за время обработки.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    source = recipe.image.name
+    with recipe.image.open('rb') as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image = image.convert('RGB')
+    extension = settings.IMAGE_RENDITIONS_FORMAT.lower()
+    stem = PurePath(source).stem
+    previous, names = [], {}
+    for field, size in settings.IMAGE_RENDITIONS.items():
+        file_field = getattr(recipe, field)
+        previous.append(file_field.name)
+        file_field.save(
+            f'{stem}_{size}.{extension}',
+            ContentFile(render(image, size)),
+            save=False,
+        )
+        names[field] = file_field.name
+    updated = Recipe.objects.filter(pk=recipe_id, image=source).update(
+        **names
+    )
+    if updated:
+        bump_version(f'recipe:{recipe_id}')
+        bump_version('recipes')
+        delete_unreferenced_files(previous)
+    else:
+        delete_unreferenced_files(names.values())
+
+
+def run_build_renditions(recipe_id):
+    try:
+        build_renditions(recipe_id)
+    except Exception:
+        logger.exception('Image renditions failed for recipe %s', recipe_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_renditions(recipe_id):
+    """
+    Ставит построение копий в пул фоновых потоков после фиксации
+    транзакции. При IMAGE_RENDITIONS_ASYNC=False строит сразу.
+    """
+    if settings.IMAGE_RENDITIONS_ASYNC:
+        transaction.on_commit(
+            lambda: executor.submit(run_build_renditions, recipe_id)
+        )
+    else:
+        transaction.on_commit(lambda: build_renditions(recipe_id))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from recipes.images import build_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Построение уменьшенных копий изображений рецептов. Рецепты '
+        'с отсутствующим или поврежденным изображением пропускаются '
+        'с сообщением об ошибке.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Перестроить копии для всех рецептов.',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(
+                Q(image_thumbnail='') | Q(image_card='')
+            )
+        count = failed = 0
+        for recipe_id in recipes.values_list('pk', flat=True).iterator():
+            count += 1
+            try:
+                build_renditions(recipe_id)
+            except Exception as error:
+                failed += 1
+                self.stderr.write(
+                    f'Пропущен рецепт {recipe_id}: '
+                    f'{type(error).__name__}: {error}'
+                )
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(
+            style(f'Обработано рецептов: {count}, с ошибками: {failed}')
+        )
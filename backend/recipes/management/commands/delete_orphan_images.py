@@ -0,0 +1,45 @@
+from itertools import chain
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.signals import RECIPE_FILE_FIELDS
+from recipes.storage import delete_unreferenced_files
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет изображения, на которые не ссылается ни один рецепт, '
+        'в том числе оставленные очисткой из-за '
+        'STORED_FILES_DELETE_GRACE_SECONDS. Запускается периодически.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directory',
+            default='images',
+            help='Каталог хранилища с изображениями рецептов.',
+        )
+
+    def handle(self, *args, **options):
+        stored = set(self.walk(options['directory']))
+        referenced = set(chain.from_iterable(
+            Recipe.objects.values_list(*RECIPE_FILE_FIELDS).iterator()
+        ))
+        orphans = stored - referenced
+        delete_unreferenced_files(orphans)
+        deleted = sum(not default_storage.exists(name) for name in orphans)
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов: {len(stored)}, без ссылок: {len(orphans)}, '
+            f'удалено: {deleted}'
+        ))
+
+    def walk(self, directory):
+        if not default_storage.exists(directory):
+            return
+        directories, files = default_storage.listdir(directory)
+        for name in files:
+            yield f'{directory}/{name}'
+        for name in directories:
+            yield from self.walk(f'{directory}/{name}')
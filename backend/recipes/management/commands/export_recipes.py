@@ -0,0 +1,129 @@
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from recipes.models import Recipe, RecipeIngredient
+from recipes.signals import RECIPE_FILE_FIELDS
+
+
+def copy_file(name, media_dir):
+    target = os.path.join(media_dir, name)
+    if os.path.exists(target):
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with default_storage.open(name, 'rb') as source, \
+            open(target, 'wb') as destination:
+        shutil.copyfileobj(source, destination)
+
+
+class Command(BaseCommand):
+    help = (
+        'Экспорт рецептов в JSON Lines: по одному рецепту на строку '
+        'с автором, тегами, ингредиентами и именами файлов изображений. '
+        'С --media_dir файлы изображений копируются в указанный каталог.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file_path', help='Файл для записи, по умолчанию - stdout.'
+        )
+        parser.add_argument('--media_dir')
+        parser.add_argument('--batch_size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        file_path = options['file_path']
+        media_dir = options['media_dir']
+        started = time.monotonic()
+        count = 0
+        output = (
+            open(file_path, 'w', encoding='utf-8') if file_path
+            else self.stdout
+        )
+        try:
+            with ThreadPoolExecutor(options['workers']) as executor:
+                for batch in self.iter_batches(options['batch_size']):
+                    copies = []
+                    for recipe in batch:
+                        data = self.recipe_to_dict(recipe)
+                        output.write(
+                            json.dumps(data, ensure_ascii=False) + '\n'
+                        )
+                        if media_dir:
+                            copies.extend(
+                                executor.submit(copy_file, name, media_dir)
+                                for name in data['files'].values()
+                            )
+                    for copy in copies:
+                        copy.result()
+                    count += len(batch)
+        finally:
+            if file_path:
+                output.close()
+        elapsed = time.monotonic() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Экспортировано рецептов: {count}, '
+            f'{count / elapsed if elapsed else count:.0f} рецептов/с'
+        ))
+
+    def iter_batches(self, batch_size):
+        """
+        Рецепты пачками с предзагрузкой связей: в памяти не больше
+        одной пачки.
+        """
+        ids = Recipe.objects.order_by('pk').values_list(
+            'pk', flat=True
+        ).iterator(chunk_size=batch_size)
+        while True:
+            batch_ids = list(islice(ids, batch_size))
+            if not batch_ids:
+                return
+            yield Recipe.objects.filter(pk__in=batch_ids).order_by(
+                'pk'
+            ).select_related('author').prefetch_related(
+                'tags',
+                Prefetch(
+                    'recipe_ingredients',
+                    queryset=RecipeIngredient.objects.select_related(
+                        'ingredient'
+                    ),
+                ),
+            )
+
+    def recipe_to_dict(self, recipe):
+        author = recipe.author
+        return {
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+            'publish_date': recipe.publish_date.isoformat(),
+            'author': {
+                'username': author.username,
+                'email': author.email,
+                'first_name': author.first_name,
+                'last_name': author.last_name,
+            },
+            'tags': [
+                {'name': tag.name, 'color': tag.color, 'slug': tag.slug}
+                for tag in recipe.tags.all()
+            ],
+            'ingredients': [
+                {
+                    'name': item.ingredient.name,
+                    'measurement_unit': item.ingredient.measurement_unit,
+                    'amount': item.amount,
+                }
+                for item in recipe.recipe_ingredients.all()
+            ],
+            'files': {
+                field: getattr(recipe, field).name
+                for field in RECIPE_FILE_FIELDS
+                if getattr(recipe, field)
+            },
+        }
@@ -1,30 +1,173 @@
+import csv
+import io
 import json
+import time
+from itertools import islice
+from pathlib import Path
+
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 from recipes.models import Ingredient
+from recipes.versions import bump_version
+
+
+def iter_json_array(file, chunk_size=64 * 1024):
+    """
+    Потоковое чтение JSON-массива объектов без загрузки файла целиком.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, started = '', 0, False
+    while True:
+        chunk = file.read(chunk_size)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != '[':
+                    raise CommandError('Ожидается JSON-массив.')
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise CommandError('Некорректный JSON.')
+                break
+            yield item
+        if not chunk:
+            return
 
 
 class Command(BaseCommand):
-    help = 'Импорт ингредиентов из JSON файла.'
+    help = (
+        'Импорт ингредиентов из JSON или CSV файла. Повторный импорт '
+        'не создает дублей: уже существующие пары '
+        '(название, ед. изм.) пропускаются. Обе колонки входят в ключ, '
+        'поэтому обновлять в существующих строках нечего и число '
+        'обновленных всегда 0. Строки без пары значений пропускаются '
+        'с предупреждением.'
+    )
 
     def add_arguments(self, parser):
         parser.add_argument('--file_path')
+        parser.add_argument(
+            '--format',
+            choices=('json', 'csv'),
+            help='Формат файла, по умолчанию - по расширению.',
+        )
+        parser.add_argument('--batch_size', type=int, default=1000)
 
     def handle(self, *args, **options):
         file_path = options['file_path']
         if not file_path:
-            raise CommandError("Укажите путь к JSON файлу")
+            raise CommandError("Укажите путь к JSON или CSV файлу")
+        file_format = options['format'] or Path(file_path).suffix[1:].lower()
+        if file_format not in ('json', 'csv'):
+            raise CommandError('Поддерживаются форматы json и csv.')
 
-        self.import_ingredients_from_json(file_path)
+        started = time.monotonic()
+        read, inserted, self.invalid = 0, 0, 0
+        with open(file_path, 'r', encoding='utf-8') as file:
+            rows = self.read_rows(file, file_format)
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                read += len(batch)
+                inserted += self.import_batch(batch)
+        bump_version('ingredients')
 
-    def import_ingredients_from_json(self, file_path):
-        with open(file_path, 'r') as file:
-            ingredients_data = json.load(file)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано: {read}, добавлено: {inserted}, обновлено: 0, '
+            f'пропущено: {read - inserted}, '
+            f'некорректных строк: {self.invalid}, '
+            f'{read / elapsed if elapsed else read:.0f} строк/с'
+        ))
 
-        ingredients = [
-            Ingredient(
-                name=data['name'], measurement_unit=data['measurement_unit']
+    def read_rows(self, file, file_format):
+        """
+        Пары (название, ед. изм.) из файла. Остальные строки
+        пропускаются и считаются в self.invalid.
+        """
+        if file_format == 'json':
+            items = (
+                (f'элемент {number}', (
+                    data.get('name'), data.get('measurement_unit')
+                ) if isinstance(data, dict) else (data,))
+                for number, data in enumerate(iter_json_array(file), 1)
+            )
+        else:
+            reader = csv.reader(file)
+            items = (
+                (f'строка {reader.line_num}', row) for row in reader if row
+            )
+        for position, row in items:
+            if len(row) != 2 or not all(
+                isinstance(value, str) for value in row
+            ):
+                self.invalid += 1
+                self.stderr.write(
+                    f'Пропущена {position}: ожидается название '
+                    f'и единица измерения, получено {row!r}'
+                )
+                continue
+            name, measurement_unit = row
+            yield name.strip(), measurement_unit.strip()
+
+    def import_batch(self, batch):
+        batch = list(dict.fromkeys(batch))
+        if connection.vendor == 'postgresql':
+            return self.copy_batch(batch)
+        return self.create_batch(batch)
+
+    @transaction.atomic
+    def copy_batch(self, batch):
+        """
+        COPY во временную таблицу и вставка отсутствующих строк.
+        """
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            # ON COMMIT DROP не сработал бы внутри внешней транзакции,
+            # и следующий пакет не смог бы создать таблицу.
+            cursor.execute(
+                'CREATE TEMP TABLE ingredient_import '
+                '(name text, measurement_unit text)'
+            )
+            cursor.copy_expert(
+                'COPY ingredient_import (name, measurement_unit) '
+                'FROM STDIN WITH (FORMAT csv)',
+                buffer,
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT name, measurement_unit FROM ingredient_import '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
             )
-            for data in ingredients_data
-        ]
+            inserted = cursor.rowcount
+            cursor.execute('DROP TABLE ingredient_import')
+            return inserted
 
-        Ingredient.objects.bulk_create(ingredients)
+    @transaction.atomic
+    def create_batch(self, batch):
+        """
+        bulk_create с ignore_conflicts не сообщает, сколько строк
+        вставлено, поэтому число считается по таблице.
+        """
+        before = Ingredient.objects.count()
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(name=name, measurement_unit=measurement_unit)
+                for name, measurement_unit in batch
+            ),
+            ignore_conflicts=True,
+        )
+        return Ingredient.objects.count() - before
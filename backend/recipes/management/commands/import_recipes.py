@@ -0,0 +1,196 @@
+import json
+import os
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag, User
+from recipes.versions import bump_version
+
+
+def copy_file(name, media_dir, dry_run):
+    """
+    Копирует файл из каталога экспорта в хранилище и возвращает
+    имя, под которым он сохранен.
+    """
+    path = os.path.join(media_dir, name)
+    if dry_run:
+        if not os.path.exists(path):
+            raise CommandError(f'Файл не найден: {path}')
+        return name
+    with open(path, 'rb') as file:
+        return default_storage.save(name, File(file))
+
+
+class Command(BaseCommand):
+    help = (
+        'Импорт рецептов из JSON Lines, созданного export_recipes. '
+        'Недостающие авторы, теги и ингредиенты создаются. С --dry_run '
+        'импорт выполняется в откатываемой транзакции без копирования '
+        'файлов - для оценки скорости.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file_path')
+        parser.add_argument(
+            '--media_dir',
+            help=(
+                'Каталог с файлами изображений. Без него имена файлов '
+                'сохраняются как есть.'
+            ),
+        )
+        parser.add_argument('--batch_size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--dry_run', action='store_true')
+
+    def handle(self, *args, **options):
+        file_path = options['file_path']
+        if not file_path:
+            raise CommandError('Укажите путь к файлу JSON Lines')
+        self.media_dir = options['media_dir']
+        self.dry_run = options['dry_run']
+        started = time.monotonic()
+        count = 0
+        with open(file_path, 'r', encoding='utf-8') as file, \
+                ThreadPoolExecutor(options['workers']) as executor, \
+                transaction.atomic() if self.dry_run else nullcontext():
+            self.executor = executor
+            lines = (line for line in file if line.strip())
+            while True:
+                batch = [
+                    json.loads(line)
+                    for line in islice(lines, options['batch_size'])
+                ]
+                if not batch:
+                    break
+                self.import_batch(batch)
+                count += len(batch)
+            if self.dry_run:
+                transaction.set_rollback(True)
+        if not self.dry_run:
+            call_command('reconcile_counters', stdout=self.stdout)
+            for name in ('recipes', 'tags', 'ingredients', 'users'):
+                bump_version(name)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Проверено" if self.dry_run else "Импортировано"} '
+            f'рецептов: {count}, '
+            f'{count / elapsed if elapsed else count:.0f} рецептов/с'
+        ))
+
+    @transaction.atomic
+    def import_batch(self, batch):
+        files = self.copy_files(batch)
+        authors = self.get_or_create(
+            User, 'username',
+            {data['author']['username']: data['author'] for data in batch},
+            password=make_password(None),
+        )
+        tags = self.get_or_create(
+            Tag, 'slug',
+            {tag['slug']: tag for data in batch for tag in data['tags']},
+        )
+        ingredients = self.get_ingredients(batch)
+
+        recipes = [
+            Recipe(
+                author=authors[data['author']['username']],
+                name=data['name'],
+                text=data['text'],
+                cooking_time=data['cooking_time'],
+                **{
+                    field: files[name]
+                    for field, name in data['files'].items()
+                },
+            )
+            for data in batch
+        ]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+        else:
+            for recipe in recipes:
+                recipe.save()
+        for recipe, data in zip(recipes, batch):
+            recipe.publish_date = parse_datetime(data['publish_date'])
+        Recipe.objects.bulk_update(recipes, ['publish_date'])
+
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tags[tag['slug']])
+            for recipe, data in zip(recipes, batch)
+            for tag in data['tags']
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=ingredients[
+                    (item['name'], item['measurement_unit'])
+                ],
+                amount=item['amount'],
+            )
+            for recipe, data in zip(recipes, batch)
+            for item in data['ingredients']
+        )
+
+    def copy_files(self, batch):
+        """
+        Параллельно копирует файлы изображений пачки.
+        """
+        names = {name for data in batch for name in data['files'].values()}
+        if not self.media_dir:
+            return {name: name for name in names}
+        return dict(zip(names, self.executor.map(
+            copy_file,
+            names,
+            [self.media_dir] * len(names),
+            [self.dry_run] * len(names),
+        )))
+
+    def get_or_create(self, model, field, values, **defaults):
+        """
+        Объекты по значениям уникального поля; отсутствующие создаются
+        одним bulk_create.
+        """
+        objects = model.objects.in_bulk(values, field_name=field)
+        missing = values.keys() - objects.keys()
+        if missing:
+            model.objects.bulk_create(
+                model(**values[key], **defaults) for key in missing
+            )
+            objects.update(
+                model.objects.in_bulk(missing, field_name=field)
+            )
+        return objects
+
+    def get_ingredients(self, batch):
+        keys = {
+            (item['name'], item['measurement_unit'])
+            for data in batch for item in data['ingredients']
+        }
+        names = {name for name, _ in keys}
+
+        def fetch():
+            return {
+                (ingredient.name, ingredient.measurement_unit): ingredient
+                for ingredient in Ingredient.objects.filter(name__in=names)
+            }
+
+        ingredients = fetch()
+        if keys - ingredients.keys():
+            Ingredient.objects.bulk_create(
+                (
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in keys - ingredients.keys()
+                ),
+                ignore_conflicts=True,
+            )
+            ingredients = fetch()
+        return ingredients
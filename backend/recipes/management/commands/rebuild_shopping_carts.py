@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.models import ShoppingCartIngredient
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчет итогов корзин покупок по рецептам в корзинах. '
+        'С --check только проверяет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить итоги, ничего не изменяя.',
+        )
+        parser.add_argument('--batch_size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        drift = self.find_drift()
+        self.stdout.write(f'Расхождений в итогах корзин: {len(drift)}')
+        for user_id, ingredient_id in drift[:20]:
+            self.stdout.write(
+                f'  user={user_id} ingredient={ingredient_id}'
+            )
+        if options['check']:
+            if drift:
+                raise CommandError('Итоги корзин расходятся с корзинами.')
+            return
+        self.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Итоги корзин пересчитаны.'))
+
+    def find_drift(self):
+        """
+        Пары (пользователь, ингредиент), где сохраненный итог
+        не совпадает с пересчитанным.
+        """
+        stored = dict(
+            ((user_id, ingredient_id), amount)
+            for user_id, ingredient_id, amount
+            in ShoppingCartIngredient.objects.values_list(
+                'user', 'ingredient', 'amount'
+            ).iterator()
+        )
+        drift = []
+        for total in ShoppingCartIngredient.objects.expected_totals(
+        ).iterator():
+            key = (total['user'], total['ingredient'])
+            if stored.pop(key, None) != total['amount']:
+                drift.append(key)
+        drift.extend(stored)
+        return drift
+
+    @transaction.atomic
+    def rebuild(self, batch_size):
+        ShoppingCartIngredient.objects.all().delete()
+        ShoppingCartIngredient.objects.bulk_create(
+            (
+                ShoppingCartIngredient(
+                    user_id=total['user'],
+                    ingredient_id=total['ingredient'],
+                    amount=total['amount'],
+                )
+                for total in ShoppingCartIngredient.objects.expected_totals(
+                ).iterator()
+            ),
+            batch_size=batch_size,
+        )
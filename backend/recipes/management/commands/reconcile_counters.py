@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Q
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart, \
+    Subscription, User, UserStats, count_of
+
+
+RECIPE_COUNTERS = {
+    'favorites_count': (FavoriteRecipe, 'recipe'),
+    'in_carts_count': (ShoppingCart, 'recipe'),
+}
+
+USER_COUNTERS = {
+    'recipes_count': (Recipe, 'author'),
+    'subscribers_count': (Subscription, 'author'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчет денормализованных счетчиков рецептов и пользователей. '
+        'С --check только проверяет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить счетчики, ничего не изменяя.',
+        )
+
+    def handle(self, *args, **options):
+        missing = User.objects.filter(stats__isnull=True)
+        drift = {
+            'recipes': self.drift(Recipe.objects.all(), RECIPE_COUNTERS),
+            'users': self.drift(UserStats.objects.all(), USER_COUNTERS)
+            + missing.count(),
+        }
+        self.stdout.write(
+            f'Расхождений в счетчиках: рецептов - {drift["recipes"]}, '
+            f'пользователей - {drift["users"]}'
+        )
+        if options['check']:
+            if any(drift.values()):
+                raise CommandError('Счетчики расходятся с данными.')
+            return
+        with transaction.atomic():
+            UserStats.objects.bulk_create(
+                (UserStats(user_id=pk) for pk in missing.values_list(
+                    'pk', flat=True
+                ).iterator()),
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+            self.reconcile(Recipe.objects.all(), RECIPE_COUNTERS)
+            self.reconcile(UserStats.objects.all(), USER_COUNTERS)
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны.'))
+
+    def drift(self, queryset, counters):
+        """
+        Число строк, где хотя бы один счетчик не совпадает с подсчетом.
+        """
+        queryset = queryset.annotate(**{
+            f'actual_{field}': count_of(*source)
+            for field, source in counters.items()
+        })
+        condition = Q()
+        for field in counters:
+            condition |= ~Q(**{field: F(f'actual_{field}')})
+        return queryset.filter(condition).count()
+
+    def reconcile(self, queryset, counters):
+        queryset.update(**{
+            field: count_of(*source) for field, source in counters.items()
+        })
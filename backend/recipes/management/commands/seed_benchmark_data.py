@@ -0,0 +1,220 @@
+import io
+import random
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from PIL import Image
+from recipes.models import FavoriteRecipe, Ingredient, Recipe, \
+    RecipeIngredient, ShoppingCart, Subscription, Tag, User
+from recipes.versions import bump_version
+
+
+USERNAME_PREFIX = 'bench_user_'
+
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+    ('Десерт', '#F9A62B', 'dessert'),
+    ('Постное', '#2B9AF9', 'lenten'),
+)
+
+
+def skewed_weights(count, exponent):
+    """
+    Накопленные веса распределения Ципфа: первые элементы выбираются
+    намного чаще последних.
+    """
+    return list(accumulate(1 / (rank + 1) ** exponent
+                           for rank in range(count)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполнение БД синтетическими данными для нагрузочного '
+        'тестирования: пользователи, рецепты, избранное, корзины '
+        'и подписки с неравномерным распределением популярности.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Среднее число избранных рецептов на пользователя.',
+        )
+        parser.add_argument(
+            '--carts', type=int, default=5,
+            help='Среднее число рецептов в корзине пользователя.',
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=10,
+            help='Среднее число подписок пользователя.',
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель распределения Ципфа для популярности.',
+        )
+        parser.add_argument(
+            '--ingredients_path',
+            default=str(settings.BASE_DIR / 'ingredients.json'),
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch_size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.skew = options['skew']
+        if not Ingredient.objects.exists():
+            call_command(
+                'import_ingredients',
+                file_path=options['ingredients_path'],
+                stdout=self.stdout,
+            )
+        with transaction.atomic():
+            tags = self.create_tags()
+            users = self.create_users(options['users'])
+            recipes = self.create_recipes(options['recipes'], users, tags)
+            self.create_links(
+                FavoriteRecipe, 'recipe', users, recipes,
+                options['favorites'],
+            )
+            self.create_links(
+                ShoppingCart, 'recipe', users, recipes, options['carts'],
+            )
+            self.create_links(
+                Subscription, 'author', users, users,
+                options['subscriptions'],
+            )
+        call_command('rebuild_shopping_carts', stdout=self.stdout)
+        call_command('reconcile_counters', stdout=self.stdout)
+        for name in ('recipes', 'tags', 'ingredients', 'users'):
+            bump_version(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, рецептов: {len(recipes)}'
+        ))
+
+    def create_tags(self):
+        for name, color, slug in TAGS:
+            Tag.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'color': color}
+            )
+        return list(Tag.objects.values_list('pk', flat=True))
+
+    def create_users(self, count):
+        start = User.objects.filter(
+            username__startswith=USERNAME_PREFIX
+        ).count()
+        password = make_password(None)
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f'{USERNAME_PREFIX}{number}',
+                    email=f'{USERNAME_PREFIX}{number}@example.com',
+                    first_name='Пользователь',
+                    last_name=str(number),
+                    password=password,
+                )
+                for number in range(start, start + count)
+            ),
+            batch_size=self.batch_size,
+        )
+        return list(User.objects.filter(
+            username__startswith=USERNAME_PREFIX
+        ).order_by('pk').values_list('pk', flat=True)[start:])
+
+    def create_image(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (600, 400), '#E26C2D').save(buffer, 'PNG')
+        return default_storage.save(
+            'images/benchmark.png', ContentFile(buffer.getvalue())
+        )
+
+    def create_recipes(self, count, users, tags):
+        """
+        Рецепты с авторами по Ципфу: немногие авторы пишут большую
+        часть рецептов.
+        """
+        image = self.create_image()
+        ingredients = list(Ingredient.objects.values_list('pk', flat=True))
+        ingredient_weights = skewed_weights(len(ingredients), self.skew)
+        authors = self.random.choices(
+            users, cum_weights=skewed_weights(len(users), self.skew),
+            k=count,
+        )
+        last_id = Recipe.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        for start in range(0, count, self.batch_size):
+            Recipe.objects.bulk_create(
+                Recipe(
+                    author_id=author,
+                    name=f'Рецепт {start + number}',
+                    text='Описание рецепта. ' * 20,
+                    cooking_time=self.random.randint(5, 180),
+                    image=image,
+                )
+                for number, author in enumerate(
+                    authors[start:start + self.batch_size]
+                )
+            )
+        recipes = list(Recipe.objects.filter(pk__gt=last_id).order_by(
+            'pk'
+        ).values_list('pk', flat=True))
+        Recipe.tags.through.objects.bulk_create(
+            (
+                Recipe.tags.through(recipe_id=recipe, tag_id=tag)
+                for recipe in recipes
+                for tag in self.random.sample(
+                    tags, self.random.randint(1, min(3, len(tags)))
+                )
+            ),
+            batch_size=self.batch_size,
+        )
+        RecipeIngredient.objects.bulk_create(
+            (
+                RecipeIngredient(
+                    recipe_id=recipe,
+                    ingredient_id=ingredient,
+                    amount=self.random.randint(1, 500),
+                )
+                for recipe in recipes
+                for ingredient in set(self.random.choices(
+                    ingredients, cum_weights=ingredient_weights,
+                    k=self.random.randint(3, 12),
+                ))
+            ),
+            batch_size=self.batch_size,
+        )
+        return recipes
+
+    def create_links(self, model, field, users, targets, average):
+        """
+        Связи пользователь - объект: число связей у пользователя
+        распределено экспоненциально, цели выбираются по Ципфу.
+        """
+        if not targets:
+            return
+        user_field = 'subscriber' if model is Subscription else 'user'
+        weights = skewed_weights(len(targets), self.skew)
+        model.objects.bulk_create(
+            (
+                model(**{f'{user_field}_id': user, f'{field}_id': target})
+                for user in users
+                for target in set(self.random.choices(
+                    targets, cum_weights=weights,
+                    k=int(self.random.expovariate(1 / average))
+                    if average else 0,
+                ))
+                if target != user or model is not Subscription
+            ),
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
@@ -0,0 +1,45 @@
+# Generated by Django 3.2 on 2026-10-18 02:18
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class PostgresRunSQL(migrations.RunSQL):
+    """
+    RunSQL, который на других СУБД ничего не делает.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_shopping_cart_ingredient'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        PostgresRunSQL(
+            'CREATE INDEX IF NOT EXISTS ingredient_name_prefix_idx '
+            'ON recipes_ingredient (UPPER(name) text_pattern_ops)',
+            'DROP INDEX IF EXISTS ingredient_name_prefix_idx',
+        ),
+        PostgresRunSQL(
+            'CREATE INDEX IF NOT EXISTS ingredient_name_trgm_idx '
+            'ON recipes_ingredient USING gin (UPPER(name) gin_trgm_ops)',
+            'DROP INDEX IF EXISTS ingredient_name_trgm_idx',
+        ),
+    ]
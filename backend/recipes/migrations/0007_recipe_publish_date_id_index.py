@@ -0,0 +1,21 @@
+# Generated by Django 3.2 on 2026-10-18 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_ingredient_name_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='recipe',
+            options={'ordering': ['-publish_date', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-publish_date', '-id'], name='recipe_publish_date_id_idx'),
+        ),
+    ]
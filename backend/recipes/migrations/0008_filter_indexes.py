@@ -0,0 +1,29 @@
+# Generated by Django 3.2 on 2026-10-18 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_publish_date_id_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favoriterecipe',
+            index=models.Index(fields=['recipe', 'user'], name='favorite_recipe_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-publish_date', '-id'], name='recipe_author_publish_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(fields=['recipe', 'user'], name='cart_recipe_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['subscriber', 'author'], name='subscription_subscriber_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-18 02:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_card',
+            field=models.ImageField(blank=True, upload_to='images/renditions'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, upload_to='images/renditions'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 3.2 on 2026-10-18 02:27
+
+from django.db import migrations, models
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ShoppingCartIngredient = apps.get_model(
+        'recipes', 'ShoppingCartIngredient'
+    )
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep=models.Min('id'), total=models.Count('id')
+    ).filter(total__gt=1).order_by()
+    for duplicate in duplicates.iterator():
+        keep = duplicate['keep']
+        others = list(Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit'],
+        ).exclude(id=keep).values_list('id', flat=True))
+        RecipeIngredient.objects.filter(
+            ingredient__in=others
+        ).update(ingredient=keep)
+        for item in ShoppingCartIngredient.objects.filter(
+            ingredient__in=others
+        ):
+            kept = ShoppingCartIngredient.objects.filter(
+                user=item.user_id, ingredient=keep
+            ).first()
+            if kept is None:
+                item.ingredient_id = keep
+                item.save(update_fields=['ingredient'])
+            else:
+                kept.amount += item.amount
+                kept.save(update_fields=['amount'])
+                item.delete()
+        Ingredient.objects.filter(id__in=others).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 3.2 on 2026-10-18 02:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def count_of(model, field):
+    return models.functions.Coalesce(models.Subquery(
+        model.objects.filter(
+            **{field: models.OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            total=models.Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FavoriteRecipe = apps.get_model('recipes', 'FavoriteRecipe')
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    Subscription = apps.get_model('recipes', 'Subscription')
+    UserStats = apps.get_model('recipes', 'UserStats')
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=pk)
+            for pk in User.objects.values_list('pk', flat=True).iterator()
+        ),
+        batch_size=1000,
+    )
+    UserStats.objects.update(
+        recipes_count=count_of(Recipe, 'author'),
+        subscribers_count=count_of(Subscription, 'author'),
+    )
+    Recipe.objects.update(
+        favorites_count=count_of(FavoriteRecipe, 'recipe'),
+        in_carts_count=count_of(ShoppingCart, 'recipe'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0011_ingredient_unique_name_unit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipes_count', models.PositiveIntegerField(default=0, verbose_name='Рецептов')),
+                ('subscribers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В корзинах'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
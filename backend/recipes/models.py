@@ -1,4 +1,8 @@
-from django.db import models
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth import get_user_model
 from django.conf import settings
 
@@ -21,8 +25,16 @@ class Ingredient(models.Model):
 
     class Meta:
         ordering = ['name']
+        # Индексы поиска по UPPER(name) есть только в PostgreSQL,
+        # их создает миграция 0006.
         indexes = [
-            models.Index(fields=['name'])
+            models.Index(fields=['name']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient',
+            ),
         ]
 
     def __str__(self):
@@ -38,6 +50,10 @@ class Recipe(models.Model):
         Ingredient, through='RecipeIngredient'
     )
     image = models.ImageField(upload_to='images')
+    image_thumbnail = models.ImageField(
+        upload_to='images/renditions', blank=True
+    )
+    image_card = models.ImageField(upload_to='images/renditions', blank=True)
     name = models.CharField(max_length=settings.FIELD_SIZE)
     text = models.TextField()
     cooking_time = models.PositiveSmallIntegerField()
@@ -48,9 +64,25 @@ class Recipe(models.Model):
         User, through='ShoppingCart', related_name='in_users_cart'
     )
     publish_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    favorites_count = models.PositiveIntegerField(
+        'В избранном', default=0, editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'В корзинах', default=0, editable=False
+    )
 
     class Meta:
-        ordering = ['-publish_date']
+        ordering = ['-publish_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['-publish_date', '-id'],
+                name='recipe_publish_date_id_idx',
+            ),
+            models.Index(
+                fields=['author', '-publish_date', '-id'],
+                name='recipe_author_publish_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -74,6 +106,12 @@ class Subscription(models.Model):
 
     class Meta:
         unique_together = ('author', 'subscriber')
+        indexes = [
+            models.Index(
+                fields=['subscriber', 'author'],
+                name='subscription_subscriber_idx',
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['author', 'subscriber'],
@@ -89,6 +127,62 @@ class Subscription(models.Model):
         return self.subscriber.get_username()
 
 
+def count_of(model, field):
+    """
+    Коррелированный подзапрос: число строк model, ссылающихся
+    на внешнюю строку через field.
+    """
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def add_to_counters(queryset, **deltas):
+    """
+    Атомарно меняет счетчики F-выражением, не опуская их ниже нуля.
+    Возвращает число обновленных строк.
+    """
+    return queryset.update(**{
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+
+
+class UserStatsManager(models.Manager):
+
+    def add(self, user_id, **deltas):
+        """
+        Меняет счетчики пользователя. Строка создается только при
+        увеличении: уменьшение без строки приходит при удалении самого
+        пользователя.
+        """
+        updated = add_to_counters(self.filter(user_id=user_id), **deltas)
+        if not updated and any(delta > 0 for delta in deltas.values()):
+            self.get_or_create(user_id=user_id)
+            add_to_counters(self.filter(user_id=user_id), **deltas)
+
+
+class UserStats(models.Model):
+    """
+    Денормализованные счетчики пользователя.
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name='stats',
+    )
+    recipes_count = models.PositiveIntegerField('Рецептов', default=0)
+    subscribers_count = models.PositiveIntegerField('Подписчиков', default=0)
+
+    objects = UserStatsManager()
+
+    def __str__(self):
+        return str(self.user)
+
+
 class FavoriteRecipe(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='favorites'
@@ -99,6 +193,11 @@ class FavoriteRecipe(models.Model):
 
     class Meta:
         unique_together = ('user', 'recipe')
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'], name='favorite_recipe_user_idx'
+            ),
+        ]
 
 
 class ShoppingCart(models.Model):
@@ -111,3 +210,123 @@ class ShoppingCart(models.Model):
 
     class Meta:
         unique_together = ('user', 'recipe')
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'], name='cart_recipe_user_idx'
+            ),
+        ]
+
+
+class ShoppingCartIngredientManager(models.Manager):
+
+    def expected_totals(self, users=None):
+        """
+        Итоги корзин, посчитанные заново по связанным таблицам.
+        """
+        carts = ShoppingCart.objects.all()
+        if users is not None:
+            carts = carts.filter(user__in=users)
+        return carts.values(
+            'user', ingredient=models.F(
+                'recipe__recipe_ingredients__ingredient'
+            )
+        ).annotate(
+            amount=Sum('recipe__recipe_ingredients__amount')
+        ).filter(ingredient__isnull=False).order_by('user', 'ingredient')
+
+    def apply_delta(self, user_ids, delta):
+        """
+        Изменяет итоги корзин пользователей на delta - словарь
+        {id ингредиента: изменение количества}. Недостающие строки
+        сначала вставляются с нулем через INSERT ... ON CONFLICT DO NOTHING,
+        чтобы параллельные транзакции не падали на unique_cart_ingredient,
+        затем все строки блокируются и изменяются.
+        """
+        delta = {pk: amount for pk, amount in delta.items() if amount}
+        user_ids = list(user_ids)
+        if not user_ids or not delta:
+            return
+        wanted = {
+            (user_id, ingredient_id)
+            for user_id in user_ids
+            for ingredient_id, amount in delta.items()
+            if amount > 0
+        }
+        with transaction.atomic(using=self.db):
+            # строку могла удалить параллельная транзакция между вставкой
+            # и блокировкой, тогда вставка повторяется
+            while True:
+                totals = {
+                    (total.user_id, total.ingredient_id): total
+                    for total in self.select_for_update().filter(
+                        user_id__in=user_ids, ingredient_id__in=delta
+                    ).order_by('pk')
+                }
+                missing = wanted - totals.keys()
+                if not missing:
+                    break
+                self.bulk_create([
+                    self.model(
+                        user_id=user_id, ingredient_id=ingredient_id, amount=0
+                    )
+                    for user_id, ingredient_id in missing
+                ], ignore_conflicts=True)
+            to_update, to_delete = [], []
+            for total in totals.values():
+                total.amount += delta[total.ingredient_id]
+                if total.amount > 0:
+                    to_update.append(total)
+                else:
+                    to_delete.append(total.pk)
+            self.bulk_update(to_update, ['amount'])
+            self.filter(pk__in=to_delete).delete()
+
+    def recipe_users(self, recipe_id):
+        """
+        Пользователи, у которых рецепт в корзине.
+        """
+        return ShoppingCart.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user', flat=True)
+
+    def recipe_amounts(self, recipe):
+        """
+        Количество каждого ингредиента рецепта.
+        """
+        amounts = Counter()
+        for ingredient_id, amount in RecipeIngredient.objects.filter(
+            recipe=recipe
+        ).values_list('ingredient_id', 'amount'):
+            amounts[ingredient_id] += amount
+        return amounts
+
+    def add_recipe(self, user_ids, recipe):
+        self.apply_delta(user_ids, self.recipe_amounts(recipe))
+
+    def remove_recipe(self, user_ids, recipe):
+        self.apply_delta(user_ids, {
+            ingredient_id: -amount
+            for ingredient_id, amount in self.recipe_amounts(recipe).items()
+        })
+
+
+class ShoppingCartIngredient(models.Model):
+    """
+    Денормализованные итоги корзины: сколько ингредиента нужно
+    пользователю по всем рецептам в корзине.
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='cart_ingredients'
+    )
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
+    amount = models.PositiveIntegerField()
+
+    objects = ShoppingCartIngredientManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_cart_ingredient',
+            ),
+        ]
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.db import connections
+
+
+def estimate_count(queryset):
+    """
+    Оценка количества строк по плану запроса PostgreSQL. Небольшие
+    выборки, как и другие СУБД, считаются точно через COUNT(*).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    rows = int(plan[0]['Plan']['Plan Rows'])
+    if rows < settings.ESTIMATED_COUNT_THRESHOLD:
+        return queryset.count()
+    return rows
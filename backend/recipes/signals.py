@@ -0,0 +1,223 @@
+from collections import Counter
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, \
+    m2m_changed
+from django.dispatch import receiver
+
+from .models import Ingredient, Tag, Recipe, RecipeIngredient, User, \
+    Subscription, FavoriteRecipe, ShoppingCart, ShoppingCartIngredient, \
+    UserStats, add_to_counters
+from .storage import delete_unreferenced_files
+from .versions import bump_version, forget_version
+
+
+RECIPE_FILE_FIELDS = ('image', 'image_thumbnail', 'image_card')
+USER_PROFILE_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+def bump_on_commit(name):
+    """
+    Версия меняется после фиксации транзакции, чтобы по новой версии
+    нельзя было прочитать старые данные.
+    """
+    transaction.on_commit(partial(bump_version, name))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredients_changed(sender, **kwargs):
+    bump_on_commit('ingredients')
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tags_changed(sender, **kwargs):
+    bump_on_commit('tags')
+
+
+@receiver((post_save, post_delete), sender=User)
+def users_changed(sender, update_fields=None, **kwargs):
+    """
+    Профили авторов входят в ответы с рецептами. Сохранение только
+    служебных полей, например last_login при входе, их не меняет.
+    """
+    if update_fields is None or update_fields & USER_PROFILE_FIELDS:
+        bump_on_commit('users')
+
+
+def recipe_changed_on_commit(recipe_id):
+    bump_on_commit(f'recipe:{recipe_id}')
+    bump_on_commit('recipes')
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    recipe_changed_on_commit(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    bump_on_commit('recipes')
+    transaction.on_commit(partial(forget_version, f'recipe:{instance.pk}'))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    recipe_changed_on_commit(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, **kwargs):
+    if action.startswith('post_') and isinstance(instance, Recipe):
+        recipe_changed_on_commit(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=FavoriteRecipe)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def user_recipes_changed(sender, instance, **kwargs):
+    bump_on_commit(f'user:{instance.user_id}')
+
+
+@receiver((post_save, post_delete), sender=Subscription)
+def subscription_changed(sender, instance, **kwargs):
+    bump_on_commit(f'user:{instance.subscriber_id}')
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_save, sender=Recipe)
+def increment_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        update_counters(sender, instance, 1)
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscription)
+@receiver(post_delete, sender=Recipe)
+def decrement_counters(sender, instance, **kwargs):
+    update_counters(sender, instance, -1)
+
+
+def update_counters(sender, instance, delta):
+    """
+    Счетчики рецептов и пользователей, которые зависят от строки.
+    """
+    if sender is FavoriteRecipe:
+        add_to_counters(
+            Recipe.objects.filter(pk=instance.recipe_id),
+            favorites_count=delta,
+        )
+    elif sender is ShoppingCart:
+        add_to_counters(
+            Recipe.objects.filter(pk=instance.recipe_id),
+            in_carts_count=delta,
+        )
+    elif sender is Subscription:
+        UserStats.objects.add(instance.author_id, subscribers_count=delta)
+    else:
+        UserStats.objects.add(instance.author_id, recipes_count=delta)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_cart_totals(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        ShoppingCartIngredient.objects.add_recipe(
+            [instance.user_id], instance.recipe_id
+        )
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_from_cart_totals(sender, instance, **kwargs):
+    """
+    При каскадном удалении рецепта строки корзин и ингредиентов рецепта
+    удаляются в любом порядке: каждая строка вычитает только пары
+    корзина-ингредиент, которые еще есть в БД, поэтому итоги сходятся.
+    """
+    ShoppingCartIngredient.objects.remove_recipe(
+        [instance.user_id], instance.recipe_id
+    )
+
+
+def change_cart_totals(recipe_id, delta):
+    ShoppingCartIngredient.objects.apply_delta(
+        ShoppingCartIngredient.objects.recipe_users(recipe_id), delta
+    )
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def remember_recipe_ingredient(sender, instance, raw=False, **kwargs):
+    instance._stored_row = None
+    if instance.pk and not raw:
+        instance._stored_row = RecipeIngredient.objects.filter(
+            pk=instance.pk
+        ).values_list('recipe', 'ingredient', 'amount').first()
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def recipe_ingredient_saved(sender, instance, raw=False, **kwargs):
+    """
+    Итоги корзин при правке ингредиентов рецепта через save(), например
+    в инлайне админки. bulk_create и bulk_update сигналов не шлют,
+    их итоги пересчитывает вызывающий код.
+    """
+    if raw:
+        return
+    delta = Counter({instance.ingredient_id: instance.amount})
+    stored = getattr(instance, '_stored_row', None)
+    if stored:
+        recipe_id, ingredient_id, amount = stored
+        if recipe_id == instance.recipe_id:
+            delta[ingredient_id] -= amount
+        else:
+            change_cart_totals(recipe_id, {ingredient_id: -amount})
+    change_cart_totals(instance.recipe_id, delta)
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_deleted(sender, instance, **kwargs):
+    change_cart_totals(
+        instance.recipe_id, {instance.ingredient_id: -instance.amount}
+    )
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_recipe_files(sender, instance, **kwargs):
+    instance._stored_files, instance._stored_author_id = (), None
+    if instance.pk:
+        *instance._stored_files, instance._stored_author_id = (
+            Recipe.objects.filter(pk=instance.pk).values_list(
+                *RECIPE_FILE_FIELDS, 'author'
+            ).first() or (None,)
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def move_recipes_count(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_stored_author_id', None)
+    if not created and previous and previous != instance.author_id:
+        UserStats.objects.add(previous, recipes_count=-1)
+        UserStats.objects.add(instance.author_id, recipes_count=1)
+
+
+@receiver(post_save, sender=Recipe)
+def delete_replaced_files(sender, instance, **kwargs):
+    current = {getattr(instance, field).name for field in RECIPE_FILE_FIELDS}
+    replaced = set(getattr(instance, '_stored_files', ())) - current
+    if replaced:
+        transaction.on_commit(partial(delete_unreferenced_files, replaced))
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_recipe_files(sender, instance, **kwargs):
+    transaction.on_commit(partial(
+        delete_unreferenced_files,
+        [getattr(instance, field).name for field in RECIPE_FILE_FIELDS]
+    ))
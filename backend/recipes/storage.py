@@ -0,0 +1,71 @@
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db.models import Q
+from django.utils import timezone
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файлы именуются хэшем содержимого: <каталог>/<ab>/<sha256>.<ext>.
+    Одинаковые загрузки хранятся один раз, а файл по имени никогда
+    не меняется, поэтому его можно кэшировать бессрочно.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory = os.path.dirname(name)
+        if os.path.basename(directory) == digest[:2]:
+            # Имя уже построено по содержимому, например при импорте.
+            directory = os.path.dirname(directory)
+        name = os.path.join(
+            directory,
+            digest[:2],
+            digest + os.path.splitext(name)[1].lower(),
+        ).replace('\\', '/')
+        try:
+            # Повторная загрузка обновляет время файла: рецепт, который
+            # на него сошлется, еще не зафиксирован, и очистка
+            # в параллельной транзакции не должна удалить файл.
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return super().save(name, content, max_length=max_length)
+        return name
+
+
+def delete_unreferenced_files(names, grace=None):
+    """
+    Удаляет файлы, на которые больше не ссылается ни один рецепт.
+    Файлы, сохраненные или загруженные повторно меньше grace секунд
+    назад (по умолчанию STORED_FILES_DELETE_GRACE_SECONDS), остаются:
+    ссылка на них может быть в еще не зафиксированной транзакции.
+    """
+    from .models import Recipe
+
+    if grace is None:
+        grace = settings.STORED_FILES_DELETE_GRACE_SECONDS
+    deadline = timezone.now() - timedelta(seconds=grace)
+    for name in set(filter(None, names)):
+        referenced = Recipe.objects.filter(
+            Q(image=name) | Q(image_thumbnail=name) | Q(image_card=name)
+        ).exists()
+        if referenced:
+            continue
+        try:
+            if default_storage.get_modified_time(name) > deadline:
+                continue
+        except FileNotFoundError:
+            continue
+        default_storage.delete(name)
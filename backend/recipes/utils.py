@@ -1,18 +1,117 @@
 import csv
-from django.http import HttpResponse
+import io
+import os
 
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
+from reportlab.pdfgen import canvas
 
-def queryset_to_csv(ingredients_list):
+
+SHOPPING_LIST_HEADER = ('Название', 'Количество', 'Ед. изм.')
+SHOPPING_LIST_FILENAME = 'shoping_list'
+PDF_FONT_NAME = 'ShoppingListFont'
+
+
+class Echo:
+    """
+    Псевдо-буфер для csv.writer: возвращает строку вместо записи.
+    """
+
+    def write(self, value):
+        return value
+
+
+def shopping_list_to_csv(ingredients):
+    """
+    Построчная выгрузка списка покупок в csv.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(SHOPPING_LIST_HEADER)
+    for row in ingredients:
+        yield writer.writerow(row)
+
+
+def shopping_list_to_txt(ingredients):
+    """
+    Построчная выгрузка списка покупок в текстовом виде.
+    """
+    yield 'Список покупок\n\n'
+    for name, amount, measurement_unit in ingredients:
+        yield f'{name} ({measurement_unit}) — {amount}\n'
+
+
+def register_pdf_font():
+    """
+    Регистрирует шрифт PDF_FONT_PATH при запуске приложения.
+    Возвращает False, если шрифт не загружен: тогда pdf выводится
+    встроенным Helvetica, а не падает посреди потокового ответа.
+    """
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return True
+    if not settings.PDF_FONT_PATH or \
+            not os.path.isfile(settings.PDF_FONT_PATH):
+        return False
+    try:
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, settings.PDF_FONT_PATH))
+    except TTFError:
+        return False
+    return True
+
+
+def shopping_list_to_pdf(ingredients):
+    """
+    Выгрузка списка покупок в pdf. Документ собирается целиком,
+    строки при этом читаются из курсора по одной.
+    """
+    font_name = 'Helvetica'
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        font_name = PDF_FONT_NAME
+    buffer = io.BytesIO()
+    page = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    margin, line_height = 50, 18
+    y = height - margin
+    page.setFont(font_name, 16)
+    page.drawString(margin, y, 'Список покупок')
+    page.setFont(font_name, 12)
+    y -= line_height * 2
+    for name, amount, measurement_unit in ingredients:
+        if y < margin:
+            page.showPage()
+            page.setFont(font_name, 12)
+            y = height - margin
+        page.drawString(
+            margin, y, f'• {name} ({measurement_unit}) — {amount}'
+        )
+        y -= line_height
+    page.save()
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(64 * 1024), b'')
+
+
+SHOPPING_LIST_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', shopping_list_to_csv),
+    'txt': ('text/plain; charset=utf-8', shopping_list_to_txt),
+    'pdf': ('application/pdf', shopping_list_to_pdf),
+}
+
+
+def shopping_list_response(ingredients, file_format='csv'):
     """
-    Конвертация queryset в csv для экспорта ингредиентов.
+    Потоковый ответ со списком покупок в заданном формате.
+    ingredients - итератор кортежей (название, количество, ед. изм.).
     """
-    response = HttpResponse(
-        content_type='text/csv',
+    content_type, writer = SHOPPING_LIST_FORMATS[file_format]
+    return StreamingHttpResponse(
+        writer(ingredients),
+        content_type=content_type,
         headers={
-            'Content-Disposition': 'attachment; filename="shoping_list.csv"'
+            'Content-Disposition': (
+                'attachment; '
+                f'filename="{SHOPPING_LIST_FILENAME}.{file_format}"'
+            )
         },
     )
-    writer = csv.writer(response)
-    writer.writerow(['Название', 'Количество', 'Ед. изм.'])
-    writer.writerows(ingredients_list)
-    return response
@@ -0,0 +1,44 @@
+from time import time
+
+from django.core.cache import cache
+
+
+VERSION_KEY = 'version:{}'
+
+
+def get_versions(*names, exists=None):
+    """
+    Текущие версии данных (например, таблиц) - время последнего изменения.
+    Если ключа в кэше нет, версией становится текущее время, поэтому
+    зависящие от нее данные будут пересчитаны. Новая версия сохраняется,
+    только если exists(name) не вернул False, чтобы запросы к
+    несуществующим объектам не создавали вечных ключей.
+    """
+    keys = {VERSION_KEY.format(name): name for name in names}
+    versions = cache.get_many(keys)
+    missing = {key: time() for key in keys if key not in versions}
+    if missing:
+        cache.set_many({
+            key: version for key, version in missing.items()
+            if exists is None or exists(keys[key])
+        }, timeout=None)
+        versions.update(missing)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def get_version(name):
+    return get_versions(name)[name]
+
+
+def bump_version(name):
+    """
+    Делает устаревшими все данные, построенные на прежней версии.
+    """
+    cache.set(VERSION_KEY.format(name), time(), timeout=None)
+
+
+def forget_version(name):
+    """
+    Удаляет версию удаленного объекта.
+    """
+    cache.delete(VERSION_KEY.format(name))